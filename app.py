@@ -1,29 +1,104 @@
-from flask import Flask, request, jsonify, send_file, abort
+from flask import (
+    Flask,
+    Response,
+    request,
+    jsonify,
+    send_file,
+    abort,
+    stream_with_context,
+)
+import io
+import gzip
+import json
 import os
+import queue
 import logging
-import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import is_resource_modified
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
-from inserter import KnowledgeGraphImporter
-from retriver import CodeAnalyzer
-from config import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE
+from inserter import KnowledgeGraphImporter, is_archive
+from retriver import CodeAnalyzer, ANALYSIS_FAILED
+from complexity import HOTSPOT_METRICS
+from jobs import IngestionJobs
+from storage import create_store
+import metrics
+from config import (
+    NEO4J_URI,
+    NEO4J_USERNAME,
+    NEO4J_PASSWORD,
+    NEO4J_DATABASE,
+    INGEST_BATCH_SIZE,
+    INGEST_WORKERS,
+    INGEST_INCREMENTAL,
+    INGEST_COMPACT_FUNCTIONS,
+    INGEST_BLOB_CONTENT,
+    INGEST_PYTHON_AST,
+    INGEST_JOB_WORKERS,
+    INGEST_JOB_QUEUE_SIZE,
+    UPLOAD_MAX_BYTES,
+)
+
+
+try:
+    import brotli
+except ImportError:  # Optional; JSON responses fall back to gzip
+    brotli = None
 
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# JSON responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 512
+# Default and largest number of functions returned by the hotspots endpoint
+HOTSPOTS_DEFAULT_LIMIT = 10
+HOTSPOTS_MAX_LIMIT = 100
+# Default and largest depth of call graph reachability queries, and the most functions
+# one query returns
+REACH_DEFAULT_DEPTH = 3
+REACH_MAX_DEPTH = 20
+REACH_MAX_FUNCTIONS = 5000
+
 # Initialize Flask app
 app = Flask(__name__)
 
 CORS(app)
+# Larger uploads are rejected before they are read
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES
 app.secret_key = os.environ.get("SESSION_SECRET", "dev_key_replace_in_prod")
 
+# Graph storage shared by the importers and the analyzer (Neo4j or embedded SQLite)
+store = create_store()
+
+
+def create_importer():
+    return KnowledgeGraphImporter(
+        NEO4J_URI,
+        NEO4J_USERNAME,
+        NEO4J_PASSWORD,
+        NEO4J_DATABASE,
+        batch_size=INGEST_BATCH_SIZE,
+        workers=INGEST_WORKERS,
+        incremental=INGEST_INCREMENTAL,
+        compact=INGEST_COMPACT_FUNCTIONS,
+        blob_content=INGEST_BLOB_CONTENT,
+        python_ast=INGEST_PYTHON_AST,
+        store=store,
+    )
+
+
 # Initialize your custom modules
-inserter = KnowledgeGraphImporter(
-    NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE
-)
-analyzer = CodeAnalyzer()
+inserter = create_importer()
+try:
+    # Verifies the connection and creates the constraints and indexes ingestion relies on
+    inserter.connect()
+except Exception:
+    logger.warning(
+        f"{store.name} schema was not initialised; ingestion will run without indexes"
+    )
+analyzer = CodeAnalyzer(store)
 
 # Allowed file types
 ALLOWED_EXTENSIONS = {
@@ -44,103 +119,374 @@ def allowed_file(filename):
     return os.path.splitext(filename)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def sse_response(tokens):
+    """
+    Streams text pieces to the browser as server-sent events. Each piece is sent as a
+    JSON string in a message event, followed by a final "done" event, or by an "error"
+    event if producing the pieces failed, so clients can discard the partial text.
+    """
+
+    def events():
+        try:
+            for token in tokens:
+                yield f"data: {json.dumps(token)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            error = json.dumps({"message": "Generation failed"})
+            yield f"event: error\ndata: {error}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def import_uploads(importer, project_name, uploads):
+    """
+    Creates the project and imports the uploaded (filename, stream) pairs into it.
+    Files are parsed straight from their streams; .zip and .tar(.gz) archives are
+    imported member by member. Calls and imports are resolved across everything the
+    importer holds, so it must be fresh or reset.
+    """
+    importer.set_project(project_name)
+    for filename, stream in uploads:
+        file_name = secure_filename(filename)
+        if is_archive(filename):
+            # Import every supported file in the archive under the project
+            importer.import_archive(
+                file_name, stream, path_prefix=project_name, file_filter=allowed_file
+            )
+        else:
+            importer.import_stream(f"{project_name}/{file_name}", stream)
+    # Write any files still buffered in batched mode
+    importer.flush()
+    # Link the uploaded files by their calls and imports
+    importer.process_function_relationships()
+    importer.process_import_relationships()
+
+
+# Background ingestion for /project/create?async=true
+jobs = IngestionJobs(
+    create_importer,
+    import_uploads,
+    workers=INGEST_JOB_WORKERS,
+    max_pending=INGEST_JOB_QUEUE_SIZE,
+)
+
+
+def set_validators(response, etag, last_modified=None, weak=True):
+    """Adds an ETag (and Last-Modified) so clients revalidate instead of refetching."""
+    response.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Compresses JSON responses with brotli or gzip when the client accepts it."""
+    if (
+        response.mimetype != "application/json"
+        or response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    if brotli is not None and request.accept_encodings["br"]:
+        response.set_data(brotli.compress(data))
+        response.headers["Content-Encoding"] = "br"
+    elif request.accept_encodings["gzip"]:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
 @app.route("/")
 def index():
     projects = analyzer.get_all_projects()
-    return jsonify(projects)
+    response = jsonify(projects)
+    response.add_etag(weak=True)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.route("/project/create", methods=["POST"])
 def create_project():
     """
     Uploads one or more code files for a project and inserts them into the Neo4j database.
+    With async=true the upload is queued as a background job and its id is returned
+    right away; poll /jobs/<job_id> for progress.
+    With INGEST_INCREMENTAL, uploading to an existing project updates it: files whose
+    content is unchanged are skipped, changed ones replace their stored version, and
+    files left out of the upload stay as they were.
     """
     try:
         project_name = request.form.get("project_name")
         if not project_name:
             return jsonify({"message": "Project name is required"}), 400
 
-        # Check if the project already exists
-        projects = analyzer.get_all_projects()
-        if project_name in projects:
+        # Check if the project is being created, or exists and cannot be updated
+        exists = project_name in analyzer.get_all_projects()
+        if jobs.is_pending(project_name) or (exists and not INGEST_INCREMENTAL):
             return jsonify({"message": "Project name already exists"}), 400
 
-        # Create/Set the project in your knowledge graph
-        inserter.set_project(project_name)
-
         # Retrieve uploaded files
         files = request.files.getlist("files")
         if not files:
             return jsonify({"message": "Files are required"}), 400
-
         for file in files:
-            if file and allowed_file(file.filename):
-                file_name = secure_filename(file.filename)
-                # Save file temporarily
-                file_path = os.path.join(tempfile.gettempdir(), file_name)
-                file.save(file_path)
-                # Import file content into Neo4j
-                inserter.import_data(file_path)
-                # Remove the temporary file
-                os.remove(file_path)
-            else:
+            if not file or not (
+                is_archive(file.filename) or allowed_file(file.filename)
+            ):
                 return jsonify({"message": "Invalid file type"}), 400
 
-        return jsonify({"message": "Project created successfully"}), 200
+        if request.values.get("async", "").lower() in ("1", "true"):
+            # The request stream closes with the response, so keep the data in memory
+            uploads = [(file.filename, io.BytesIO(file.read())) for file in files]
+            try:
+                job_id = jobs.submit(project_name, uploads)
+            except queue.Full:
+                message = "Too many uploads queued, try again later"
+                return jsonify({"message": message}), 503
+            return jsonify({"message": "Project import queued", "job_id": job_id}), 202
+
+        # A fresh importer per request: its imported_data must only hold this project
+        import_uploads(
+            create_importer(),
+            project_name,
+            [(file.filename, file.stream) for file in files],
+        )
+
+        message = "Project updated successfully" if exists else "Project created successfully"
+        return jsonify({"message": message}), 200
+    except RequestEntityTooLarge:
+        return jsonify({"message": "Upload is too large"}), 413
     except Exception as e:
         logger.error(f"Error creating project: {e}")
         return jsonify({"message": "Internal server error"}), 500
 
 
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """
+    Reports the progress of a background ingestion job: files parsed,
+    nodes written and elapsed time.
+    """
+    status = jobs.status(job_id)
+    if status is None:
+        return jsonify({"message": "Job not found"}), 404
+    return jsonify(status)
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Exposes parse, storage, LLM, cache and job metrics in the Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/project/<project_name>")
 def project_analysis(project_name):
     """
     Retrieves code for the given project, performs analysis using the LLM, and returns the documentation.
+    Supports conditional requests: the ETag and Last-Modified derive from the project's
+    file hashes, so an unchanged project answers 304 without running the analysis.
+    """
+    try:
+        version = analyzer.analysis_version(project_name)
+        if version and not is_resource_modified(
+            request.environ, etag=version[0], last_modified=version[1]
+        ):
+            return set_validators(Response(status=304), *version)
+
+        analysis = analyzer.analyze_project(project_name)
+        if analysis is None:
+            return jsonify({"message": "Project not found"}), 404
+
+        response = jsonify({"analysis": analysis})
+        if version and analysis != ANALYSIS_FAILED:
+            set_validators(response, *version)
+        return response
+    except Exception as e:
+        logger.error(f"Error analyzing project: {e}")
+        return jsonify({"message": "Internal server error"}), 500
+
+
+@app.route("/project/<project_name>/stream")
+def project_analysis_stream(project_name):
+    """
+    Streams the project's documentation as server-sent events while the LLM generates it.
     """
     try:
-        code_content = analyzer.retrieve_code(project_name)
-        if not code_content:
+        tokens = analyzer.stream_project_analysis(project_name)
+        if tokens is None:
             return jsonify({"message": "Project not found"}), 404
 
-        analysis = analyzer.perform_analysis(code_content)
-        return jsonify({"analysis": analysis})
+        return sse_response(tokens)
     except Exception as e:
         logger.error(f"Error analyzing project: {e}")
         return jsonify({"message": "Internal server error"}), 500
 
 
+@app.route("/project/<project_name>/hotspots")
+def project_hotspots(project_name):
+    """
+    Returns the project's most complex functions from the metrics stored at ingestion.
+    Query parameters: metric (one of loc, cyclomatic, max_nesting, loop_depth, fan_out,
+    fan_in; default cyclomatic) and limit (default 10, at most 100).
+    """
+    metric = request.args.get("metric", "cyclomatic")
+    if metric not in HOTSPOT_METRICS:
+        message = f"metric must be one of {', '.join(HOTSPOT_METRICS)}"
+        return jsonify({"message": message}), 400
+    limit = request.args.get("limit", HOTSPOTS_DEFAULT_LIMIT, type=int)
+    if limit < 1:
+        return jsonify({"message": "limit must be a positive integer"}), 400
+    try:
+        functions = analyzer.hotspots(
+            project_name, metric, min(limit, HOTSPOTS_MAX_LIMIT)
+        )
+        if functions is None:
+            return jsonify({"message": "Project not found"}), 404
+
+        return jsonify({"metric": metric, "functions": functions})
+    except Exception as e:
+        logger.error(f"Error retrieving hotspots: {e}")
+        return jsonify({"message": "Internal server error"}), 500
+
+
+@app.route("/project/<project_name>/functions/<function_name>/<direction>")
+def function_reach(project_name, function_name, direction):
+    """
+    Returns the functions transitively reachable from a function in the call graph:
+    direction "callees" answers "what does it reach", "callers" answers "who reaches it".
+    The function is given by name or by qualified name (e.g. Parser.parse).
+    Query parameters: depth (default 3, at most 20) and file, to pick one of several
+    functions with the same name.
+    """
+    if direction not in ("callees", "callers"):
+        return jsonify({"message": "direction must be callees or callers"}), 400
+    depth = request.args.get("depth", REACH_DEFAULT_DEPTH, type=int)
+    if depth < 1:
+        return jsonify({"message": "depth must be a positive integer"}), 400
+    depth = min(depth, REACH_MAX_DEPTH)
+    try:
+        result = analyzer.reachable(
+            project_name,
+            function_name,
+            direction,
+            depth,
+            REACH_MAX_FUNCTIONS,
+            file=request.args.get("file"),
+        )
+        if result is None:
+            return jsonify({"message": "Function not found"}), 404
+
+        return jsonify({"direction": direction, "depth": depth, **result})
+    except Exception as e:
+        logger.error(f"Error walking the call graph: {e}")
+        return jsonify({"message": "Internal server error"}), 500
+
+
+@app.route("/project/<project_name>/imports/<query>")
+def project_imports(project_name, query):
+    """
+    Answers module dependency queries over the project's IMPORTS edges: "cycles" lists
+    the groups of modules importing each other, "layers" orders the modules so each layer
+    only depends on the ones below. by=directory groups the files by directory.
+    """
+    if query not in ("cycles", "layers"):
+        return jsonify({"message": "query must be cycles or layers"}), 400
+    by = request.args.get("by", "file")
+    if by not in ("file", "directory"):
+        return jsonify({"message": "by must be file or directory"}), 400
+    try:
+        if query == "cycles":
+            result = analyzer.import_cycles(project_name, by)
+        else:
+            result = analyzer.import_layers(project_name, by)
+        if result is None:
+            return jsonify({"message": "Project not found"}), 404
+
+        return jsonify({"by": by, query: result})
+    except Exception as e:
+        logger.error(f"Error querying module dependencies: {e}")
+        return jsonify({"message": "Internal server error"}), 500
+
+
 @app.route("/project/<project_name>/<question>")
 def project_question(project_name, question):
     """
-    Retrieves code for the project, generates documentation, and answers a user-provided question.
+    Answers a user-provided question from the project's most relevant functions
+    and its cached documentation summary.
     """
     try:
-        code_content = analyzer.retrieve_code(project_name)
-        if not code_content:
+        answer = analyzer.answer_project_question(project_name, question)
+        if answer is None:
             return jsonify({"message": "Project not found"}), 404
 
-        # Generate documentation from the code
-        documentation = analyzer.perform_analysis(code_content)
-        answer = analyzer.answer_question(documentation, question)
         return jsonify({"answer": answer})
     except Exception as e:
         logger.error(f"Error answering question: {e}")
         return jsonify({"message": "Internal server error"}), 500
 
 
+@app.route("/project/<project_name>/<question>/stream")
+def project_question_stream(project_name, question):
+    """
+    Streams the answer to a user-provided question as server-sent events.
+    """
+    try:
+        tokens = analyzer.stream_project_answer(project_name, question)
+        if tokens is None:
+            return jsonify({"message": "Project not found"}), 404
+
+        return sse_response(tokens)
+    except Exception as e:
+        logger.error(f"Error answering question: {e}")
+        return jsonify({"message": "Internal server error"}), 500
+
+
 @app.route("/project/<project_name>/report")
 def project_report(project_name):
     """
     Generates a PDF report for the project analysis and returns the file.
+    The report's ETag is the hash of its analysis and history: unchanged reports answer
+    304, and Range/If-Range requests can resume a download.
+    With async=true, a report that is not rendered yet answers 202 while it renders in
+    the background; repeat the request to download it.
     """
     try:
-        # Validate project exists by retrieving its code
-        code_content = analyzer.retrieve_code(project_name)
-        if not code_content:
+        if not analyzer.project_exists(project_name):
             return jsonify({"message": "Project not found"}), 404
 
-        report = analyzer.generate_pdf(project_name)
-        return send_file(report, as_attachment=True)
+        # Byte ranges need a strong validator, so the 304 repeats send_file's strong ETag
+        version = analyzer.report_version(project_name)
+        if not is_resource_modified(request.environ, etag=version):
+            return set_validators(Response(status=304), version, weak=False)
+
+        wait = request.args.get("async", "").lower() not in ("1", "true")
+        version, report = analyzer.generate_pdf(project_name, wait=wait)
+        if report is None:
+            response = jsonify({"message": "Report is being generated, retry shortly"})
+            response.status_code = 202
+            response.headers["Retry-After"] = "2"
+            return response
+
+        return send_file(
+            report,
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=f"{project_name}_analysis_report.pdf",
+            etag=version,
+            conditional=True,
+        )
     except Exception as e:
         logger.error(f"Error generating report: {e}")
         return jsonify({"message": "Internal server error"}), 500
@@ -0,0 +1,379 @@
+"""
+Benchmarks for ingestion and extraction on a synthetic code base.
+
+Generates source files for every language detect_language knows and measures the
+throughput of each extractor, how call resolution scales with the number of files, and
+end-to-end process_directory time against an in-memory SQLite store standing in for Neo4j.
+Results are written as JSON so runs can be compared over time:
+
+    python benchmark.py --files 20 --functions 10 --depth 3 --call-density 1.5
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import platform
+import tempfile
+from inserter import KnowledgeGraphImporter
+from storage import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Every extension detect_language maps to a language.
+LANGUAGE_EXTENSIONS = (
+    ".py", ".cs", ".java", ".js", ".ts", ".cpp", ".c", ".h", ".rb", ".go", ".php"
+)
+
+# Lines each generated file starts with, exercising extract_packages.
+FILE_HEADERS = {
+    ".py": "import os\nimport json\nfrom collections import OrderedDict\n",
+    ".cs": "using System;\nusing System.Collections.Generic;\n",
+    ".java": "import java.util.List;\nimport java.util.Map;\n",
+    ".js": "import fs from 'fs';\nconst path = require('path');\n",
+    ".ts": "import fs from 'fs';\nconst path = require('path');\n",
+    ".cpp": '#include <vector>\n#include "util.h"\n',
+    ".c": '#include <stdio.h>\n#include "util.h"\n',
+    ".h": "#include <stddef.h>\n",
+    ".rb": "require 'json'\n",
+    ".go": 'package main\n\nimport "fmt"\n',
+    ".php": "<?php\n",
+}
+
+# Function headers of the brace-delimited languages.
+BRACE_HEADERS = {
+    ".cs": "public static int {name}(int value) {{",
+    ".java": "public static int {name}(int value) {{",
+    ".js": "function {name}(value) {{",
+    ".ts": "function {name}(value) {{",
+    ".cpp": "int {name}(int value) {{",
+    ".c": "int {name}(int value) {{",
+    ".h": "static inline int {name}(int value) {{",
+    ".go": "func {name}(value int) int {{",
+    ".php": "function {name}($value) {{",
+}
+
+
+def function_name(ext, file_index, function_index):
+    return f"{ext[1:]}_{file_index}_fn{function_index}"
+
+
+def _python_function(name, calls, depth):
+    lines = [f"def {name}(value):", f'    """Generated function {name}."""']
+    indent = "    "
+    for level in range(depth):
+        lines.append(f"{indent}if value > {level}:")
+        indent += "    "
+    lines.extend(f"{indent}value = {call}(value)" for call in calls)
+    lines.append(f"{indent}return value")
+    lines.append("    return 0")
+    return lines
+
+
+def _ruby_function(name, calls, depth):
+    lines = [f"def {name}(value)"]
+    indent = "  "
+    for level in range(depth):
+        lines.append(f"{indent}if value > {level}")
+        indent += "  "
+    lines.extend(f"{indent}value = {call}(value)" for call in calls)
+    for level in range(depth):
+        indent = indent[:-2]
+        lines.append(f"{indent}end")
+    lines.append("  value")
+    lines.append("end")
+    return lines
+
+
+def _brace_function(ext, name, calls, depth):
+    variable = "$value" if ext == ".php" else "value"
+    lines = [BRACE_HEADERS[ext].format(name=name)]
+    indent = "    "
+    for level in range(depth):
+        # Braces inside comments must not confuse the lexers
+        lines.append(f"{indent}// block {{ {level} }}")
+        lines.append(f"{indent}if ({variable} > {level}) {{")
+        indent += "    "
+    lines.extend(f"{indent}{variable} = {call}({variable});" for call in calls)
+    for level in range(depth):
+        indent = indent[:-4]
+        lines.append(f"{indent}}}")
+    lines.append(f"    return {variable};")
+    lines.append("}")
+    return lines
+
+
+def generate_file(ext, names, calls, depth):
+    """
+    Returns the source of one file defining the given function names.
+    calls[i] lists the functions the i-th function calls; depth is the block nesting inside
+    each function body.
+    """
+    lines = FILE_HEADERS[ext].splitlines()
+    wrapped = ext in (".cs", ".java")
+    if wrapped:
+        lines.append(f"public class {names[0].title().replace('_', '')} {{")
+    for name, function_calls in zip(names, calls):
+        lines.append("")
+        if ext == ".py":
+            lines.extend(_python_function(name, function_calls, depth))
+        elif ext == ".rb":
+            lines.extend(_ruby_function(name, function_calls, depth))
+        else:
+            lines.extend(_brace_function(ext, name, function_calls, depth))
+    if wrapped:
+        lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_sources(
+    files, functions, depth, call_density, seed=0, extensions=LANGUAGE_EXTENSIONS
+):
+    """
+    Generates a synthetic code base as {relative path: content}, with files files per
+    language and functions functions per file. Each function calls call_density functions
+    of other files on average, chosen at random (reproducibly for a given seed).
+    """
+    rng = random.Random(seed)
+    layout = [
+        (ext, i, [function_name(ext, i, j) for j in range(functions)])
+        for ext in extensions
+        for i in range(files)
+    ]
+    all_names = [(ext, i, name) for ext, i, names in layout for name in names]
+    sources = {}
+    for ext, i, names in layout:
+        calls = []
+        for _ in names:
+            count = int(call_density) + (rng.random() < call_density % 1)
+            targets = []
+            while all_names and len(targets) < count:
+                target_ext, target_i, target = rng.choice(all_names)
+                if (target_ext, target_i) != (ext, i) or len(layout) == 1:
+                    targets.append(target)
+            calls.append(targets)
+        path = os.path.join(ext[1:], f"module_{i}{ext}")
+        sources[path] = generate_file(ext, names, calls, depth)
+    return sources
+
+
+def write_sources(directory, sources):
+    """Writes generated sources below directory."""
+    for path, content in sources.items():
+        file_path = os.path.join(directory, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def _best_time(func, repeat):
+    """Returns the fastest of repeat runs of func(), in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _rate(amount, seconds):
+    return amount / seconds if seconds > 0 else 0.0
+
+
+def benchmark_extractors(sources, repeat=3):
+    """
+    Measures extract_functions, extract_packages and extract_function_calls per language.
+    Returns {extension: stats} with throughput in MB/s and the number of items found.
+    """
+    importer = KnowledgeGraphImporter(None, None, None, None)
+    by_ext = {}
+    for path, content in sources.items():
+        by_ext.setdefault(os.path.splitext(path)[1], []).append(content)
+
+    results = {}
+    for ext, contents in by_ext.items():
+        megabytes = sum(len(c.encode("utf-8")) for c in contents) / 1e6
+        functions = [importer.extract_functions(c, ext) for c in contents]
+        names = [[f["name"] for f in found] for found in functions]
+        timings = {
+            "functions": _best_time(
+                lambda: [importer.extract_functions(c, ext) for c in contents], repeat
+            ),
+            "packages": _best_time(
+                lambda: [importer.extract_packages(c, ext) for c in contents], repeat
+            ),
+            "calls": _best_time(
+                lambda: [
+                    importer.extract_function_calls(c, n) for c, n in zip(contents, names)
+                ],
+                repeat,
+            ),
+        }
+        results[ext] = {
+            "language": importer.detect_language(ext),
+            "files": len(contents),
+            "megabytes": round(megabytes, 3),
+            "functions_found": sum(len(found) for found in functions),
+            "packages_found": sum(len(importer.extract_packages(c, ext)) for c in contents),
+            **{
+                f"{name}_mb_per_sec": round(_rate(megabytes, seconds), 2)
+                for name, seconds in timings.items()
+            },
+        }
+        logger.info(
+            f"{results[ext]['language']:>14}: functions "
+            f"{results[ext]['functions_mb_per_sec']:.1f} MB/s, "
+            f"found {results[ext]['functions_found']}"
+        )
+    return results
+
+
+def _load_importer(sources, batch_size):
+    """Returns an importer holding the parsed sources in a fresh in-memory store."""
+    importer = KnowledgeGraphImporter(
+        None, None, None, None, batch_size=batch_size, store=SQLiteStore(":memory:")
+    )
+    importer.set_project("benchmark")
+    for path, content in sources.items():
+        importer.import_content(path, content)
+    importer.flush()
+    return importer
+
+
+def benchmark_relationships(scales, functions, depth, call_density, seed=0, batch_size=500):
+    """
+    Measures process_function_relationships for each number of files per language in scales.
+    Returns one entry per scale with the time spent resolving calls and writing edges.
+    """
+    results = []
+    for files in scales:
+        sources = generate_sources(files, functions, depth, call_density, seed)
+        importer = _load_importer(sources, batch_size)
+        rows, written = importer.write_stats["rows"], importer.write_stats["seconds"]
+        start = time.perf_counter()
+        importer.process_function_relationships()
+        elapsed = time.perf_counter() - start
+        # One row is recorded per CALLS edge, between files and between functions
+        edges = importer.write_stats["rows"] - rows
+        write_seconds = importer.write_stats["seconds"] - written
+        importer.close()
+        results.append(
+            {
+                "files": len(sources),
+                "functions": len(sources) * functions,
+                "edges": edges,
+                "seconds": round(elapsed, 4),
+                "resolve_seconds": round(elapsed - write_seconds, 4),
+                "write_seconds": round(write_seconds, 4),
+            }
+        )
+        logger.info(
+            f"Resolved {edges} CALLS edges across {len(sources)} files in {elapsed:.3f}s"
+        )
+    return results
+
+
+def benchmark_ingestion(sources, batch_size=500, workers=1):
+    """
+    Measures process_directory end to end on the sources written to a temporary
+    directory, against an in-memory SQLite store.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_sources(directory, sources)
+        importer = KnowledgeGraphImporter(
+            None,
+            None,
+            None,
+            None,
+            batch_size=batch_size,
+            workers=workers,
+            store=SQLiteStore(":memory:"),
+        )
+        importer.set_project("benchmark")
+        start = time.perf_counter()
+        importer.process_directory(directory)
+        elapsed = time.perf_counter() - start
+        throughput = importer.write_throughput()
+        importer.close()
+    megabytes = sum(len(c.encode("utf-8")) for c in sources.values()) / 1e6
+    logger.info(f"Ingested {len(sources)} files in {elapsed:.3f}s")
+    return {
+        "files": len(sources),
+        "megabytes": round(megabytes, 3),
+        "batch_size": batch_size,
+        "workers": workers,
+        "seconds": round(elapsed, 4),
+        "files_per_sec": round(_rate(len(sources), elapsed), 1),
+        "mb_per_sec": round(_rate(megabytes, elapsed), 2),
+        "rows": throughput["rows"],
+        "rows_per_sec": round(throughput["rows_per_sec"], 1),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=20, help="files per language")
+    parser.add_argument("--functions", type=int, default=10, help="functions per file")
+    parser.add_argument("--depth", type=int, default=3, help="block nesting depth")
+    parser.add_argument(
+        "--call-density",
+        type=float,
+        default=1.0,
+        help="average cross-file calls per function",
+    )
+    parser.add_argument(
+        "--scales",
+        default="5,10,20,40",
+        help="comma-separated files per language for the call resolution curve",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per extractor timing")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    # Per-file import logs would dominate the timings
+    for name in ("inserter", "storage"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    sources = generate_sources(
+        args.files, args.functions, args.depth, args.call_density, args.seed
+    )
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            key: getattr(args, key)
+            for key in (
+                "files", "functions", "depth", "call_density", "repeat",
+                "batch_size", "workers", "seed",
+            )
+        },
+        "extractors": benchmark_extractors(sources, args.repeat),
+        "relationships": benchmark_relationships(
+            [int(scale) for scale in args.scales.split(",")],
+            args.functions,
+            args.depth,
+            args.call_density,
+            args.seed,
+            args.batch_size,
+        ),
+        "ingestion": benchmark_ingestion(sources, args.batch_size, args.workers),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Wrote benchmark results to {args.output}")
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,19 @@
+import zlib
+
+# Compression used for Blob.data; recorded on each Blob node as its codec.
+BLOB_CODEC = "zlib"
+
+
+def compress_content(content):
+    """Compresses file content for storage in a Blob node."""
+    return zlib.compress(content.encode("utf-8"), 6)
+
+
+def decompress_content(data):
+    """
+    Returns the text of a File's content as read from Neo4j: plain strings are returned
+    unchanged, Blob data is decompressed.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        return zlib.decompress(bytes(data)).decode("utf-8")
+    return data
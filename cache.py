@@ -0,0 +1,143 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(*parts):
+    """Builds a cache key from the SHA-256 digest of the given text parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Persistent text cache stored as one file per key in a local directory.
+
+    Entries are evicted least recently used first once the directory holds more than
+    max_bytes. Recency survives restarts through the files' modification times, which
+    are refreshed on every hit. Lookups are counted in the cache metrics under name.
+    """
+
+    def __init__(self, directory, max_bytes, name="cache"):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def _load(self):
+        """Indexes the entries already on disk, oldest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".txt"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            found.append((stat.st_mtime, name[: -len(".txt")], stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+        logger.info(f"Loaded {len(self.entries)} cache entries from {self.directory}")
+
+    def get(self, key):
+        """Returns the cached text for the key, or None on a miss."""
+        with self.lock:
+            if key not in self.entries:
+                CACHE_REQUESTS.inc(cache=self.name, result="miss")
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    value = f.read()
+                os.utime(self._path(key))
+            except OSError as e:
+                logger.error(f"Error reading cache entry {key}: {e}")
+                self.total_bytes -= self.entries.pop(key)
+                CACHE_REQUESTS.inc(cache=self.name, result="miss")
+                return None
+            self.entries.move_to_end(key)
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return value
+
+    def set(self, key, value):
+        """Stores the text under the key and evicts old entries beyond max_bytes."""
+        data = value.encode("utf-8")
+        with self.lock:
+            tmp_path = self._path(key) + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                logger.error(f"Error writing cache entry {key}: {e}")
+                return
+            self.total_bytes += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits. Caller holds the lock."""
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError as e:
+                logger.error(f"Error evicting cache entry {key}: {e}")
+
+
+class MemoryCache:
+    """
+    In-process cache of byte values, evicted least recently used first once it holds
+    more than max_entries values or max_bytes in total. Values larger than max_bytes
+    are not cached. Thread-safe; lookups are counted in the cache metrics under name.
+    """
+
+    def __init__(self, max_bytes, max_entries, name="cache"):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.name = name
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> value, least recently used first
+        self.total_bytes = 0
+
+    def get(self, key):
+        """Returns the cached value for the key, or None on a miss."""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                CACHE_REQUESTS.inc(cache=self.name, result="miss")
+                return None
+            self.entries.move_to_end(key)
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return value
+
+    def set(self, key, value):
+        """
+        Stores the value under the key and evicts old entries beyond the limits. Returns
+        False, storing nothing, when the value alone is larger than max_bytes.
+        """
+        if len(value) > self.max_bytes:
+            return False
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            self.entries[key] = value
+            self.total_bytes += len(value)
+            while self.total_bytes > self.max_bytes or len(self.entries) > self.max_entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+        return True
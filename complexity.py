@@ -0,0 +1,230 @@
+import ast
+import re
+from lexer import (
+    LINE_COMMENT,
+    BLOCK_COMMENT,
+    HASH_COMMENT,
+    TRIPLE_DOUBLE_QUOTED,
+    TRIPLE_SINGLE_QUOTED,
+    DOUBLE_QUOTED,
+    SINGLE_QUOTED,
+    BACKTICK_STRING,
+    python_string_spans,
+)
+
+# Static metrics stored on every Function node, all integers, usable as hotspot rankings.
+# fan_out counts distinct callee names, including functions from outside the project.
+METRICS = ("loc", "cyclomatic", "max_nesting", "loop_depth", "fan_out")
+# What hotspots can rank by: the static metrics plus fan_in, the number of project
+# functions calling a function, counted from the call graph after ingestion.
+HOTSPOT_METRICS = METRICS + ("fan_in",)
+
+# Keywords that open a branch or loop, for the languages scanned lexically.
+DECISION_KEYWORDS = frozenset(
+    ("if", "elif", "elseif", "for", "foreach", "while", "case", "catch", "except")
+)
+LOOP_KEYWORDS = frozenset(("for", "foreach", "while", "do"))
+BLOCK_KEYWORDS = DECISION_KEYWORDS | LOOP_KEYWORDS | frozenset(
+    ("else", "switch", "try", "finally", "with", "match")
+)
+# Words followed by '(' that are not calls
+NON_CALLS = (BLOCK_KEYWORDS - {"with", "match"}) | frozenset(
+    ("return", "sizeof", "typeof", "new", "function", "def", "class", "await", "not", "and",
+     "or", "in", "lambda", "yield", "assert")
+)
+
+# Compound statements that add a nesting level in Python
+_PYTHON_BLOCKS = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.With, ast.AsyncWith
+) + tuple(getattr(ast, name) for name in ("TryStar", "Match") if hasattr(ast, name))
+_PYTHON_LOOPS = (ast.For, ast.AsyncFor, ast.While)
+_PYTHON_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_PYTHON_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def big_o(loop_depth):
+    """Turns a loop nesting depth into a rough time complexity hint, e.g. 2 -> "O(n^2)"."""
+    if not loop_depth:
+        return "O(1)"
+    return "O(n)" if loop_depth == 1 else f"O(n^{loop_depth})"
+
+
+def count_loc(code, comment_prefixes=("//", "/*", "*", "#")):
+    """Counts the lines of code that are neither blank nor only a comment."""
+    return sum(
+        1
+        for line in code.splitlines()
+        if line.strip() and not line.strip().startswith(comment_prefixes)
+    )
+
+
+def _call_name(node):
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def python_metrics(node, code):
+    """
+    Computes the metrics of a Python definition from its ast node, plus "calls": the
+    sorted names it calls. Nested functions and classes are left out: they are Function
+    nodes of their own.
+    """
+    state = {"cyclomatic": 1, "max_nesting": 0, "loop_depth": 0, "calls": set()}
+
+    def visit(child, nesting, loops):
+        if isinstance(child, _PYTHON_DEFINITIONS):
+            return
+        if isinstance(child, _PYTHON_LOOPS):
+            loops += 1
+        elif isinstance(child, _PYTHON_COMPREHENSIONS):
+            # Every for clause loops over everything the clauses before it produce
+            loops += len(child.generators)
+        if isinstance(child, (ast.If, ast.IfExp, ast.ExceptHandler) + _PYTHON_LOOPS):
+            state["cyclomatic"] += 1
+        elif isinstance(child, ast.BoolOp):
+            state["cyclomatic"] += len(child.values) - 1
+        elif isinstance(child, ast.comprehension):
+            state["cyclomatic"] += 1 + len(child.ifs)
+        elif getattr(ast, "match_case", None) and isinstance(child, ast.match_case):
+            state["cyclomatic"] += 1
+        elif isinstance(child, ast.Call) and _call_name(child):
+            state["calls"].add(_call_name(child))
+        state["loop_depth"] = max(state["loop_depth"], loops)
+        for field, value in ast.iter_fields(child):
+            block_nesting = nesting
+            if isinstance(child, _PYTHON_BLOCKS) and field != "test":
+                # An elif is an If in the orelse of an If; keep it at the same depth
+                is_elif = (
+                    isinstance(child, ast.If)
+                    and field == "orelse"
+                    and len(value) == 1
+                    and isinstance(value[0], ast.If)
+                )
+                block_nesting = nesting if is_elif else nesting + 1
+                state["max_nesting"] = max(state["max_nesting"], block_nesting)
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, ast.AST):
+                    visit(item, block_nesting, loops)
+
+    for statement in node.body:
+        visit(statement, 0, 0)
+    return {
+        "loc": count_loc(code, ("#",)),
+        "cyclomatic": state["cyclomatic"],
+        "max_nesting": state["max_nesting"],
+        "loop_depth": state["loop_depth"],
+        "fan_out": len(state["calls"]),
+        "calls": sorted(state["calls"]),
+    }
+
+
+class MetricsScanner:
+    """
+    Computes function metrics lexically for code that is not parsed here: the
+    brace-delimited languages, and Python unless it is parsed with ast.
+
+    Decision points are counted from keywords and && / || operators outside strings and
+    comments. Nesting follows the braces opened by block keywords, or with
+    indent_blocks the indentation of the lines that start a block, outside strings
+    spanning several lines. With triple_quoted, strings in triple quotes are lexed too.
+    """
+
+    def __init__(self, hash_comments=False, indent_blocks=False, triple_quoted=False):
+        self.indent_blocks = indent_blocks
+        tokens = [LINE_COMMENT, BLOCK_COMMENT]
+        if hash_comments:
+            tokens.append(HASH_COMMENT)
+        if triple_quoted:
+            # Must come before DOUBLE_QUOTED/SINGLE_QUOTED, which would read '""' first
+            tokens += [TRIPLE_DOUBLE_QUOTED, TRIPLE_SINGLE_QUOTED]
+        tokens += [DOUBLE_QUOTED, SINGLE_QUOTED, BACKTICK_STRING]
+        tokens += [r"(?P<call>\w+)(?=\s*\()", r"(?P<word>\w+)", r"(?P<op>&&|\|\||[{}();])"]
+        self.token_pattern = re.compile("|".join(tokens), re.DOTALL)
+        self.comment_prefixes = ("//", "/*", "*") + (("#",) if hash_comments else ())
+
+    def metrics(self, code, name):
+        """Returns the metrics of a function and "calls", the sorted names it calls."""
+        cyclomatic = 1
+        calls = set()
+        header_seen = False
+        pending = None  # Kind of the block a keyword opened, until its '{' or ';'
+        parens = 0
+        stack = []  # Kind of each open brace: "loop", "block" or None
+        max_nesting = loop_depth = 0
+        for token in self.token_pattern.finditer(code):
+            word = token.group("call") or token.group("word")
+            op = token.group("op")
+            if word:
+                if word in DECISION_KEYWORDS or (self.indent_blocks and word in ("and", "or")):
+                    cyclomatic += 1
+                if word in LOOP_KEYWORDS:
+                    pending = "loop"
+                elif word in BLOCK_KEYWORDS and pending is None:
+                    pending = "block"
+                if token.group("call") and word not in NON_CALLS:
+                    if word == name and not header_seen:
+                        header_seen = True
+                    else:
+                        calls.add(word)
+            elif op in ("&&", "||"):
+                cyclomatic += 1
+            elif op == "(":
+                parens += 1
+            elif op == ")":
+                parens = max(parens - 1, 0)
+            elif op == ";" and parens == 0:
+                pending = None
+            elif op == "{":
+                stack.append(pending)
+                pending = None
+                max_nesting = max(max_nesting, sum(1 for kind in stack if kind))
+                loop_depth = max(loop_depth, stack.count("loop"))
+            elif op == "}" and stack:
+                stack.pop()
+        if self.indent_blocks:
+            max_nesting, loop_depth = self.indent_nesting(code)
+        return {
+            "loc": count_loc(code, self.comment_prefixes),
+            "cyclomatic": cyclomatic,
+            "max_nesting": max_nesting,
+            "loop_depth": loop_depth,
+            "fan_out": len(calls),
+            "calls": sorted(calls),
+        }
+
+    @staticmethod
+    def indent_nesting(code):
+        """Returns (max_nesting, loop_depth) from the indentation of block-opening lines."""
+        stack = []  # (indent, is_loop) of the enclosing block headers
+        max_nesting = loop_depth = 0
+        strings = python_string_spans(code)
+        index = 0  # First string that does not end before the current line
+        position = 0  # Offset of the current line
+        for line in code.splitlines(keepends=True):
+            offset, position = position, position + len(line)
+            while index < len(strings) and strings[index][1] <= offset:
+                index += 1
+            if offset == 0 or (index < len(strings) and strings[index][0] < offset):
+                continue  # The header line, or a line inside a string
+            stripped = line.lstrip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            indent = len(line) - len(stripped)
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            keyword = re.match(r"(?:async\s+)?(\w+)", stripped)
+            keyword = keyword.group(1) if keyword else None
+            # elif/else/except replace the block they continue at the same indentation
+            if keyword in BLOCK_KEYWORDS and stripped.rstrip().endswith(":"):
+                stack.append((indent, keyword in LOOP_KEYWORDS))
+                max_nesting = max(max_nesting, len(stack))
+                loop_depth = max(loop_depth, sum(1 for _, is_loop in stack if is_loop))
+        return max_nesting, loop_depth
+
+
+BRACE_SCANNER = MetricsScanner()
+GENERIC_SCANNER = MetricsScanner(hash_comments=True)
+PYTHON_SCANNER = MetricsScanner(hash_comments=True, indent_blocks=True, triple_quoted=True)
@@ -12,6 +12,58 @@ NEO4J_USERNAME = "neo4j"
 NEO4J_PASSWORD = "NEO4J_PASSWORD"
 NEO4J_DATABASE = "NEO4J_DATABASE"
 
+# Connection pool shared by ingestion and retrieval: maximum connections, seconds to wait
+# for a free connection, and seconds after which a connection is replaced
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+
+# Seconds create_schema waits for new indexes to come online before serving queries
+NEO4J_INDEX_WAIT_TIMEOUT = int(os.getenv("NEO4J_INDEX_WAIT_TIMEOUT", "300"))
+
+# ===================================================
+# Storage Configuration
+# ===================================================
+
+# Graph storage backend: "neo4j", or "sqlite" for an embedded database without a server
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "neo4j").lower()
+
+# SQLite database file used by the sqlite backend (":memory:" keeps the graph in memory)
+SQLITE_PATH = os.getenv("SQLITE_PATH", ".bigoh_cache/graph.sqlite3")
+
+# ===================================================
+# Ingestion Configuration
+# ===================================================
+
+# Number of files buffered per batched UNWIND write (0 writes node by node)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "0"))
+
+# Number of processes parsing files during directory imports (1 parses in-process)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+
+# Skip files whose content hash is unchanged and only recompute CALLS for changed symbols
+INGEST_INCREMENTAL = os.getenv("INGEST_INCREMENTAL", "false").lower() == "true"
+
+# Store only each function's span on Function nodes instead of duplicating its code
+INGEST_COMPACT_FUNCTIONS = os.getenv("INGEST_COMPACT_FUNCTIONS", "false").lower() == "true"
+
+# Store file contents once per SHA-256 in compressed Blob nodes instead of on File nodes
+INGEST_BLOB_CONTENT = os.getenv("INGEST_BLOB_CONTENT", "false").lower() == "true"
+
+# Parse Python with ast (classes, multi-line decorators and exact metrics) instead of
+# the faster line scanner
+INGEST_PYTHON_AST = os.getenv("INGEST_PYTHON_AST", "false").lower() == "true"
+
+# Largest upload request, largest file imported from an upload or archive member, and
+# the most uncompressed bytes imported from one archive
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+INGEST_MAX_FILE_BYTES = int(os.getenv("INGEST_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+INGEST_MAX_ARCHIVE_BYTES = int(os.getenv("INGEST_MAX_ARCHIVE_BYTES", str(256 * 1024 * 1024)))
+
+# Background ingestion jobs: worker threads and the number of jobs allowed to wait
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+INGEST_JOB_QUEUE_SIZE = int(os.getenv("INGEST_JOB_QUEUE_SIZE", "16"))
+
 # ===================================================
 # Hugging Face Configuration 
 # ===================================================
@@ -19,6 +71,39 @@ NEO4J_DATABASE = "NEO4J_DATABASE"
 HF_TOKEN = os.getenv("HF_TOKEN", "ENTER YOUR KEY")
 HF_MODEL = os.getenv("HF_MODEL", "mistralai/Mistral-7B-Instruct-v0.3")
 
+# ===================================================
+# Analysis Cache Configuration
+# ===================================================
+
+# Directory holding cached LLM analyses and its size limit (least recently used evicted first)
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", ".bigoh_cache/analysis")
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Largest amount of code sent in one prompt; bigger projects are summarized file by file
+ANALYSIS_MAX_PROMPT_CHARS = int(os.getenv("ANALYSIS_MAX_PROMPT_CHARS", "24000"))
+# Number of concurrent LLM calls while summarizing a large project
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))
+
+# Question answering: number of relevant functions sent with a question and their size limit
+QA_TOP_K = int(os.getenv("QA_TOP_K", "8"))
+QA_SNIPPET_CHARS = int(os.getenv("QA_SNIPPET_CHARS", "3000"))
+
+# Rendered PDF reports kept in memory, keyed by a hash of their content
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "64"))
+# Threads rendering reports, in the background for /project/<name>/report?async=true
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", "2"))
+
+# ===================================================
+# Session Configuration
+# ===================================================
+
+# Per-project analysis and Q&A history kept in memory for the report
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_PROJECTS = int(os.getenv("SESSION_MAX_PROJECTS", "100"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(32 * 1024 * 1024)))
+SESSION_MAX_HISTORY_CHARS = int(os.getenv("SESSION_MAX_HISTORY_CHARS", "100000"))
+
 # ===================================================
 # Logging Configuration
 # ===================================================
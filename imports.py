@@ -0,0 +1,297 @@
+import re
+import posixpath
+
+# Extensions whose imports are resolved to project files, by import syntax.
+PYTHON_EXTENSIONS = (".py",)
+JAVA_EXTENSIONS = (".java",)
+JAVASCRIPT_EXTENSIONS = (".js", ".ts", ".jsx", ".tsx", ".mjs", ".cjs")
+C_EXTENSIONS = (".c", ".h", ".cpp", ".hpp", ".cc", ".hh")
+
+# Suffixes tried, in order, after a relative JavaScript import path.
+JAVASCRIPT_SUFFIXES = ("",) + JAVASCRIPT_EXTENSIONS + tuple(
+    f"/index{ext}" for ext in JAVASCRIPT_EXTENSIONS
+)
+
+PYTHON_IMPORT = re.compile(r"^[ \t]*import[ \t]+([\w. \t,]+)", re.MULTILINE)
+PYTHON_FROM_IMPORT = re.compile(
+    r"^[ \t]*from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+(\([^)]*\)|[^\n#;]*)", re.MULTILINE
+)
+JAVA_IMPORT = re.compile(r"^\s*import\s+([\w\.]+)\s*;", re.MULTILINE)
+JAVASCRIPT_IMPORT = re.compile(
+    r'^\s*import\s+.*\s+from\s+[\'"]([\w\/\.-]+)[\'"]', re.MULTILINE
+)
+JAVASCRIPT_REQUIRE = re.compile(r'require\([\'"]([\w\/\.-]+)[\'"]\)')
+C_LOCAL_INCLUDE = re.compile(r'^\s*#include\s+"([\w\.\/-]+)"', re.MULTILINE)
+
+
+def language_group(path):
+    """Returns the import syntax a file uses ("python", "java", "javascript", "c") or None."""
+    ext = posixpath.splitext(path)[1].lower()
+    for group, extensions in (
+        ("python", PYTHON_EXTENSIONS),
+        ("java", JAVA_EXTENSIONS),
+        ("javascript", JAVASCRIPT_EXTENSIONS),
+        ("c", C_EXTENSIONS),
+    ):
+        if ext in extensions:
+            return group
+    return None
+
+
+def extract_imports(content, ext):
+    """
+    Extracts the import specifiers that may refer to files of the same project:
+    Python modules (relative ones keep their leading dots; "from a import b" yields both
+    "a.b" and "a", since b may be a submodule), Java class names, JavaScript import
+    paths and quoted C/C++ includes. System includes are left out.
+    """
+    group = language_group("x" + ext)
+    imports = []
+    if group == "python":
+        for match in PYTHON_IMPORT.finditer(content):
+            for name in match.group(1).split(","):
+                words = name.split()
+                if words:
+                    imports.append(words[0])
+        for match in PYTHON_FROM_IMPORT.finditer(content):
+            module = match.group(1)
+            separator = "" if module.endswith(".") else "."
+            for name in re.findall(r"(\w+)(?:\s+as\s+\w+)?", match.group(2)):
+                imports.append(f"{module}{separator}{name}")
+            if module.strip("."):
+                imports.append(module)
+    elif group == "java":
+        imports.extend(JAVA_IMPORT.findall(content))
+    elif group == "javascript":
+        imports.extend(JAVASCRIPT_IMPORT.findall(content))
+        imports.extend(JAVASCRIPT_REQUIRE.findall(content))
+    elif group == "c":
+        imports.extend(C_LOCAL_INCLUDE.findall(content))
+    return list(dict.fromkeys(imports))
+
+
+def external_package(specifier, ext):
+    """
+    Returns the package name a USES_PACKAGE edge records for an import that did not
+    resolve to a project file, or None for imports that can only be local.
+    """
+    group = language_group("x" + ext)
+    if group == "python":
+        return None if specifier.startswith(".") else specifier.split(".")[0]
+    if group == "java":
+        return specifier
+    return None
+
+
+def _module_parts(path, group):
+    """Splits a file path into the components an import names it by."""
+    # Includes name the file with its extension, the other imports without it
+    parts = (path if group == "c" else posixpath.splitext(path)[0]).split("/")
+    if group == "python" and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return [part for part in parts if part]
+
+
+class ImportResolver:
+    """
+    Maps import specifiers to the project files they refer to.
+
+    The index is built in one pass over the project's paths: every file is registered
+    under each trailing run of its path components (a/b/c.py under "c", "b/c" and
+    "a/b/c"), per import syntax. Absolute imports are then a single dictionary lookup,
+    relative ones an exact path lookup, so resolving a project costs time linear in its
+    files and imports rather than comparing every pair of files.
+
+    An absolute Python or Java import only resolves to a file whose module path starts
+    at a root the interpreter or class path could search: a directory enclosing the
+    importer (the project root included), or for Python the directory holding a
+    top-level package. "import json" therefore stays external even when the project
+    vendors some other package's json.py.
+    """
+
+    def __init__(self, paths):
+        self.paths = {}  # normalized path -> path as given
+        self.suffixes = {}  # (group, "b/c") -> [paths]
+        for path in paths:
+            normalized = path.replace("\\", "/")
+            self.paths[normalized] = path
+            group = language_group(normalized)
+            if group is None:
+                continue
+            parts = _module_parts(normalized, group)
+            for i in range(len(parts)):
+                key = (group, "/".join(parts[i:]))
+                self.suffixes.setdefault(key, []).append(normalized)
+        # Directories holding a top-level Python package: one without a parent package
+        self.python_roots = set()
+        for path in self.paths:
+            if posixpath.basename(path) == "__init__.py":
+                package = posixpath.dirname(path)
+                parent = posixpath.dirname(package)
+                if posixpath.join(parent, "__init__.py") not in self.paths:
+                    self.python_roots.add(parent)
+
+    def resolve(self, importer_path, specifier):
+        """Returns the path of the project file the import refers to, or None."""
+        importer = importer_path.replace("\\", "/")
+        group = language_group(importer)
+        directory = posixpath.dirname(importer)
+        if group == "python":
+            if specifier.startswith("."):
+                level = len(specifier) - len(specifier.lstrip("."))
+                base = directory
+                for _ in range(level - 1):
+                    base = posixpath.dirname(base)
+                module = specifier.lstrip(".").replace(".", "/")
+                target = posixpath.join(base, module) if module else base
+                return self._first(target + ".py", target + "/__init__.py")
+            return self._closest(group, specifier.replace(".", "/"), directory)
+        if group == "java":
+            return self._closest(group, specifier.replace(".", "/"), directory)
+        if group == "javascript":
+            if not specifier.startswith((".", "/")):
+                return None
+            target = posixpath.normpath(posixpath.join(directory, specifier))
+            return self._first(*(target + suffix for suffix in JAVASCRIPT_SUFFIXES))
+        if group == "c":
+            local = posixpath.normpath(posixpath.join(directory, specifier))
+            return self._first(local) or self._closest(group, specifier, directory)
+        return None
+
+    def _first(self, *candidates):
+        for candidate in candidates:
+            if candidate in self.paths:
+                return self.paths[candidate]
+        return None
+
+    def _closest(self, group, suffix, directory):
+        """Among the files registered under suffix, picks the one nearest the importer."""
+        suffix = posixpath.normpath(suffix)
+        candidates = self.suffixes.get((group, suffix))
+        if candidates and group in ("python", "java"):
+            candidates = [
+                path
+                for path in candidates
+                if self._searchable(_module_root(path, group, suffix), group, directory)
+            ]
+        if not candidates:
+            return None
+        best = min(
+            candidates,
+            key=lambda path: (-_common_depth(path, directory), path.count("/"), path),
+        )
+        return self.paths[best]
+
+    def _searchable(self, root, group, directory):
+        """Returns True if an absolute import from directory can find modules under root."""
+        if not root or directory == root or directory.startswith(root + "/"):
+            return True
+        return group == "python" and root in self.python_roots
+
+
+def _module_root(path, group, suffix):
+    """Returns the directory a file's module path suffix is anchored at ("" for the top)."""
+    module = (path if group == "c" else posixpath.splitext(path)[0]).rstrip("/")
+    if group == "python" and posixpath.basename(module) == "__init__":
+        module = posixpath.dirname(module)
+    return module[: -len(suffix)].rstrip("/")
+
+
+def _common_depth(path, directory):
+    """Number of leading directories the path shares with the directory."""
+    depth = 0
+    for a, b in zip(posixpath.dirname(path).split("/"), directory.split("/")):
+        if a != b:
+            break
+        depth += 1
+    return depth
+
+
+def strongly_connected_components(edges, nodes=()):
+    """
+    Returns the strongly connected components of the directed graph given as
+    (source, target) pairs plus any isolated nodes, with Tarjan's algorithm (iterative,
+    so deep graphs do not hit the recursion limit). Components come in reverse
+    topological order: each after every component it has edges to.
+    """
+    graph = {node: [] for node in nodes}
+    for source, target in edges:
+        graph.setdefault(source, []).append(target)
+        graph.setdefault(target, [])
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph[root]))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph[successor])))
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+    return components
+
+
+def dependency_cycles(edges):
+    """Returns the groups of modules that import each other, directly or transitively."""
+    self_imports = {source for source, target in edges if source == target}
+    return sorted(
+        (
+            component
+            for component in strongly_connected_components(edges)
+            if len(component) > 1 or component[0] in self_imports
+        ),
+        key=lambda component: (-len(component), component),
+    )
+
+
+def dependency_layers(edges, nodes=()):
+    """
+    Assigns every module a layer: 0 for modules that import no project module, otherwise
+    one more than the highest layer they import. Modules in a cycle share a layer.
+    Returns the layers as sorted lists of modules, lowest first.
+    """
+    components = strongly_connected_components(edges, nodes)
+    component_of = {}
+    for i, component in enumerate(components):
+        for member in component:
+            component_of[member] = i
+    dependencies = {}
+    for source, target in edges:
+        a, b = component_of[source], component_of[target]
+        if a != b:
+            dependencies.setdefault(a, set()).add(b)
+    # Tarjan emits a component only after everything it depends on
+    level = []
+    for i in range(len(components)):
+        level.append(1 + max((level[d] for d in dependencies.get(i, ())), default=-1))
+    layers = {}
+    for i, component in enumerate(components):
+        layers.setdefault(level[i], []).extend(component)
+    return [sorted(layers[n]) for n in sorted(layers)]
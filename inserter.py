@@ -1,57 +1,256 @@
 import os
+import io
+import ast
+import bisect
+import functools
 import glob
+import hashlib
+import heapq
+import posixpath
+import tarfile
+import zipfile
 import re
+import tokenize
+import time
 import logging
-from neo4j import GraphDatabase, RoutingControl
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 from neo4j.exceptions import DriverError, Neo4jError
-from config import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE
+from lexer import BraceLexer, CONTROL_KEYWORDS, line_starts, python_string_spans
+from blobs import compress_content
+from imports import ImportResolver, extract_imports, external_package
+from complexity import (
+    METRICS,
+    BRACE_SCANNER,
+    GENERIC_SCANNER,
+    PYTHON_SCANNER,
+    python_metrics,
+)
+from storage import Neo4jStore
+from metrics import PARSE_SECONDS
+from config import (
+    NEO4J_URI,
+    NEO4J_USERNAME,
+    NEO4J_PASSWORD,
+    NEO4J_DATABASE,
+    INGEST_MAX_FILE_BYTES,
+    INGEST_MAX_ARCHIVE_BYTES,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Function extractors for the brace-delimited languages, compiled once per process.
+CS_LEXER = BraceLexer(
+    r"(public|private|protected)\s+(static\s+)?\S+\s+(\w+)\s*\([^)]*\)\s*{",
+    name_group=3,
+    verbatim_strings=True,
+)
+JAVA_LEXER = BraceLexer(
+    r"(public|private|protected)\s+(static\s+)?\S+\s+(\w+)\s*\([^)]*\)\s*{",
+    name_group=3,
+)
+JAVASCRIPT_LEXER = BraceLexer(
+    r"function\s+(\w+)\s*\([^)]*\)\s*{", backtick_strings=True
+)
+# Up to eight type and qualifier words before the name, starting at a word boundary
+CPP_LEXER = BraceLexer(
+    r"(?<![\w:\*&<>])(?:[\w:\*&<>]+\s+){1,8}(\w+)\s*\([^(){};]*\)\s*{",
+    reserved_names=CONTROL_KEYWORDS,
+)
+GENERIC_LEXER = BraceLexer(
+    r"function\s+(\w+)\s*\([^)]*\)\s*{", hash_comments=True, backtick_strings=True
+)
+
+# Python statements that define a named scope, and the fields holding nested statements.
+_PYTHON_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_PYTHON_BLOCK_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+# Names of def and class statements, for the line-based Python scanner. The patterns
+# start with a literal, so finding candidates runs at str.find speed.
+PYTHON_DEF = re.compile(r"(def)[ \t]+(\w+)")
+PYTHON_CLASS = re.compile(r"(class)[ \t]+(\w+)")
+
+
+@functools.lru_cache(maxsize=None)
+def _python_block_end(indent):
+    """Matches the line break before the next non-blank line indented at most indent columns."""
+    return re.compile(r"\n(?=[ \t]{0,%d}[^ \t\r\n])" % indent)
+
+
+def _python_kind_from_keyword(keyword, parents):
+    """Names the kind of a definition from its keyword and enclosing definitions."""
+    if keyword == "class":
+        return "class"
+    in_class = bool(parents) and parents[-1]["kind"] == "class"
+    kind = "method" if in_class else "function"
+    return f"async_{kind}" if keyword == "async def" else kind
+
+
+def _python_kind(node, parents):
+    """Names the kind of an ast definition node."""
+    if isinstance(node, ast.ClassDef):
+        return _python_kind_from_keyword("class", parents)
+    if isinstance(node, ast.AsyncFunctionDef):
+        return _python_kind_from_keyword("async def", parents)
+    return _python_kind_from_keyword("def", parents)
+
+
+def _python_record(content, name, kind, parents, start_line, end_line, start, end):
+    """Builds the extracted record for a Python definition."""
+    return {
+        "name": name,
+        "code": content[start:end],
+        "kind": kind,
+        "qualname": ".".join([p["name"] for p in parents] + [name]),
+        "start_line": start_line,
+        "end_line": end_line,
+        "start": start,
+        "end": end,
+    }
+
+
+def _qualname(function):
+    """Returns the name identifying a function in its file: its qualname, if it has one."""
+    return function.get("qualname") or function["name"]
+
+
+# Upload formats that import_archive unpacks member by member.
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def is_archive(filename):
+    """Returns True if the filename has a supported archive extension."""
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def archive_member_path(path_prefix, member_name):
+    """Builds the File path of an archive member, keeping it inside path_prefix."""
+    member_path = posixpath.normpath("/" + member_name.replace("\\", "/"))
+    member_path = member_path.lstrip("/")
+    return posixpath.join(path_prefix, member_path) if path_prefix else member_path
+
+
+def content_hash(content):
+    """Returns the SHA-256 hex digest identifying a file's content."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
 
 class KnowledgeGraphImporter:
-    def __init__(self, uri, username, password, database):
+    def __init__(
+        self,
+        uri,
+        username,
+        password,
+        database,
+        batch_size=0,
+        workers=1,
+        incremental=False,
+        compact=False,
+        blob_content=False,
+        python_ast=False,
+        store=None,
+    ):
         """
         Initializes the KnowledgeGraphImporter with connection details.
         Also initializes a dictionary to store extracted metadata for each file.
+
+        When batch_size is greater than zero, parsed files are buffered and written
+        with UNWIND queries once every batch_size files instead of node by node.
+        When workers is greater than one, process_directory parses files in a process pool.
+        In incremental mode, files whose content hash matches the stored File node are skipped
+        and only the CALLS edges of changed symbols are recomputed.
+        In compact mode, Function nodes store only their span in the file, not their code.
+        With blob_content, file contents are stored once per SHA-256 in compressed Blob nodes
+        that File nodes link to, instead of in File.content.
+        With python_ast, Python files are parsed with ast instead of scanned line by line:
+        slower, but it also records classes and computes metrics from the tree.
+        Writes go to the given storage backend (see storage.py), by default Neo4j at uri.
+        Passing neither a store nor a uri creates a parse-only importer without storage.
         """
         self.uri = uri
         self.username = username
         self.password = password
         self.database = database
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
+        if store is None and uri:
+            store = Neo4jStore(uri, username, password, database)
+        self.store = store
+        self.workers = workers
+        self.compact = compact
+        self.blob_content = blob_content
+        self.python_ast = python_ast
+        self.known_blobs = set()  # Blob hashes written or found during this import
         self.project_name = None  # Will hold the main node name (Project)
         # Data structure for cross-file analysis:
         # { file_path: { "filename": ..., "functions": [{"name": ..., "code": ...}, ...],
-        #                "function_calls": [...], "packages": [...], "language": ... } }
+        #                "function_calls": [...], "packages": [...], "imports": [...],
+        #                "language": ... } }
         self.imported_data = {}
+        # Batched write mode: rows waiting to be flushed and the number of files they cover.
+        self.batch_size = batch_size
+        self.pending_rows = self._empty_rows()
+        self.pending_files = 0
+        # Incremental mode: stored state of the project's files, loaded on first use,
+        # and the function names added/removed in each changed file.
+        self.incremental = incremental
+        self.known_files = None
+        self.changed_symbols = {}
+        # Write throughput counters, shared by the per-node and batched paths.
+        self.write_stats = {"rows": 0, "seconds": 0.0}
 
     # Include all other methods from the original file
     def close(self):
-        """Closes the connection to Neo4j."""
-        if self.driver:
-            self.driver.close()
-            logger.info("Closed Neo4j connection.")
+        """Flushes pending rows and closes the storage backend."""
+        if self.store:
+            try:
+                self.flush()
+            finally:
+                self.store.close()
+                logger.info(f"Closed {self.store.name} connection.")
+
+    def reset(self):
+        """Discards all per-import state so the importer can be reused for another project."""
+        self.project_name = None
+        self.imported_data = {}
+        self.pending_rows = self._empty_rows()
+        self.pending_files = 0
+        self.known_files = None
+        self.changed_symbols = {}
+        self.known_blobs = set()
+        self.write_stats = {"rows": 0, "seconds": 0.0}
 
     def connect(self):
-        """Verifies connectivity to the Neo4j graph database."""
+        """Verifies connectivity to the storage backend and initialises its schema."""
         try:
-            self.driver.verify_connectivity()
-            logger.info("Successfully connected to Neo4j.")
+            self.store.verify_connectivity()
+            logger.info(f"Successfully connected to {self.store.name}.")
         except Exception as e:
-            logger.error(f"Failed to connect to Neo4j: {e}")
+            logger.error(f"Failed to connect to {self.store.name}: {e}")
             raise
+        self.create_schema()
+
+    def create_schema(self):
+        """
+        Creates the uniqueness constraints and lookup indexes that back every MERGE and MATCH
+        on File.path, Function{qualname, file}, Package.name and Project.name, and the
+        full-text indexes the question searches use.
+        Safe to run repeatedly; a statement that fails (e.g. because existing data holds
+        duplicates) is logged and the others are still applied.
+        """
+        try:
+            self.store.create_schema()
+            logger.info(f"Initialised {self.store.name} schema.")
+        except Exception as e:
+            logger.error(f"Error initialising {self.store.name} schema: {e}")
 
     def set_project(self, project_name):
-        """Sets the project (main node) name and creates a Project node in Neo4j."""
+        """Sets the project (main node) name and creates its Project node."""
+        # Rows buffered for the previous project must be attached to that project.
+        self.flush()
         self.project_name = project_name
-        query = "MERGE (p:Project {name: $project_name}) RETURN p"
+        self.known_files = None
         try:
-            self.driver.execute_query(
-                query, project_name=project_name, database_=self.database
-            )
+            with self.store.timed("create_project"):
+                self.store.create_project(project_name)
             logger.info(f"Created/updated Project node: {project_name}")
         except Exception as e:
             logger.error(f"Error creating Project node {project_name}: {e}")
@@ -72,39 +271,354 @@ class KnowledgeGraphImporter:
             logger.error(f"Error reading {file_path}: {e}")
             return
 
+        self.import_content(file_path, content)
+
+    def import_stream(self, file_path, stream, max_bytes=INGEST_MAX_FILE_BYTES):
+        """
+        Imports a file from an open binary or text stream (e.g. an uploaded file)
+        without saving it to disk. file_path is the path recorded on the File node.
+        At most max_bytes are read; larger files are skipped.
+        Returns the number of bytes read, or None if the file was not imported.
+        """
+        try:
+            data = stream.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                logger.warning(f"Skipped {file_path}: larger than {max_bytes} bytes")
+                return None
+            content = data.decode("utf-8") if isinstance(data, bytes) else data
+        except Exception as e:
+            logger.error(f"Error reading {file_path}: {e}")
+            return None
+        self.import_content(file_path, content)
+        return len(data)
+
+    def import_archive(
+        self,
+        archive_name,
+        stream,
+        path_prefix="",
+        file_filter=None,
+        max_file_bytes=INGEST_MAX_FILE_BYTES,
+        max_total_bytes=INGEST_MAX_ARCHIVE_BYTES,
+    ):
+        """
+        Imports every member of a .zip or tar (optionally gzip/bz2/xz compressed) archive
+        straight from the stream, one member at a time, without unpacking it to disk.
+        Members are recorded under path_prefix; file_filter(member_name) can exclude members.
+        Zip archives need a seekable stream, tar archives are read sequentially.
+        Members larger than max_file_bytes are skipped, and the import stops once the
+        imported members add up to more than max_total_bytes uncompressed.
+        """
+        imported = 0
+        total_bytes = 0
+        try:
+            members = self._iter_archive(archive_name, stream)
+            for member_name, size, member_stream in members:
+                if file_filter and not file_filter(member_name):
+                    continue
+                file_path = archive_member_path(path_prefix, member_name)
+                if size > max_file_bytes:
+                    logger.warning(f"Skipped {file_path}: larger than {max_file_bytes} bytes")
+                    continue
+                if total_bytes + size > max_total_bytes:
+                    logger.error(
+                        f"Stopped reading archive {archive_name}: more than "
+                        f"{max_total_bytes} bytes uncompressed"
+                    )
+                    break
+                read = self.import_stream(file_path, member_stream, max_file_bytes)
+                if read is not None:
+                    total_bytes += read
+                    imported += 1
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            logger.error(f"Error reading archive {archive_name}: {e}")
+        logger.info(f"Imported {imported} files from archive: {archive_name}")
+        return imported
+
+    def _iter_archive(self, archive_name, stream):
+        """
+        Yields (member_name, size, stream) for each regular file in the archive, where
+        size is the uncompressed size the archive declares for the member.
+        """
+        if archive_name.lower().endswith(".zip"):
+            with zipfile.ZipFile(stream) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        with archive.open(info) as member_stream:
+                            yield info.filename, info.file_size, member_stream
+        else:
+            with tarfile.open(fileobj=stream, mode="r|*") as archive:
+                for member in archive:
+                    if member.isfile():
+                        yield member.name, member.size, archive.extractfile(member)
+
+    def import_content(self, file_path, content, record=None):
+        """
+        Writes a file to storage and keeps its record for cross-file analysis.
+        The content is parsed unless an already parsed record is given.
+        In incremental mode, files whose content is unchanged are not parsed or written.
+        """
+        if self.incremental:
+            stored = self.stored_record(file_path, content)
+            if stored is not None:
+                self.imported_data[file_path] = stored
+                logger.debug(f"Skipped unchanged file: {file_path}")
+                return
+
+        if record is None:
+            record = self.parse_content(file_path, content)
+        if self.incremental:
+            self.track_changes(file_path, record)
+
+        if self.batch_size > 0:
+            self.queue_record(file_path, content, record)
+        else:
+            self.write_record(file_path, content, record)
+
+        # Save the extracted data locally for creating cross-file relationships later
+        self.imported_data[file_path] = record
+
+        logger.debug(f"Imported data from file: {file_path}")
+
+    def parse_content(self, file_path, content):
+        """
+        Detects the language of a file and extracts its functions, packages and function calls.
+        Returns the record that is stored in imported_data.
+        """
+        start = time.perf_counter()
         filename = os.path.basename(file_path)
         ext = os.path.splitext(file_path)[1].lower()
         language = self.detect_language(ext)
 
         # Extract information using language-specific or generic methods
         functions = self.extract_functions(content, ext)
+        self.add_function_metrics(functions, ext)
         packages = self.extract_packages(content, ext)
+        imports = extract_imports(content, ext)
         # For function calls, extract all words followed by '(' and remove those defined in the same file.
         function_calls = self.extract_function_calls(
             content, [func["name"] for func in functions]
         )
+        PARSE_SECONDS.observe(time.perf_counter() - start, language=language)
+        return {
+            "filename": filename,
+            "functions": functions,
+            "function_calls": function_calls,
+            "packages": packages,
+            "imports": imports,
+            "language": language,
+            "content_hash": content_hash(content),
+        }
+
+    def get_known_files(self):
+        """
+        Returns the stored state of the current project's files (all files without a project),
+        keyed by path. Loaded from storage once per project.
+        """
+        if self.known_files is not None:
+            return self.known_files
+        self.known_files = {}
+        try:
+            with self.store.timed("load_files"):
+                records = self.store.load_files(self.project_name)
+        except Exception as e:
+            logger.error(f"Error loading stored files: {e}")
+            return self.known_files
+        for record in records:
+            self.known_files[record["path"]] = {
+                "filename": record["filename"],
+                "functions": record["functions"],
+                "function_calls": record["function_calls"] or [],
+                "packages": [],
+                "imports": record["imports"] or [],
+                "language": record["language"],
+                "content_hash": record["content_hash"],
+                "unchanged": True,
+            }
+        logger.info(f"Loaded {len(self.known_files)} stored files")
+        return self.known_files
+
+    def stored_record(self, file_path, content):
+        """Returns the stored record of a file if its content hash is unchanged, otherwise None."""
+        known = self.get_known_files().get(file_path)
+        if known and known["content_hash"] == content_hash(content):
+            return known
+        return None
+
+    def track_changes(self, file_path, record):
+        """
+        Records which function names a changed file added or removed since the last import.
+        A name counts as added when it gains a definition, e.g. a method of another class.
+        """
+        known = self.get_known_files().get(file_path)
+        old = {(f["name"], _qualname(f)) for f in known["functions"]} if known else set()
+        new = {(f["name"], _qualname(f)) for f in record["functions"]}
+        self.changed_symbols[file_path] = {
+            "added": {name for name, _ in new - old},
+            "removed": {name for name, _ in old} - {name for name, _ in new},
+            "existed": known is not None,
+        }
+
+    def write_record(self, file_path, content, record):
+        """Writes a parsed file to storage one node at a time."""
+        start = time.perf_counter()
 
         # Create File node with properties (and attach to the Project node if set)
-        self.create_file_node(filename, file_path, content, language)
+        self.create_file_node(
+            record["filename"],
+            file_path,
+            None if self.blob_content else content,
+            record["language"],
+            content_hash=record["content_hash"],
+            function_calls=record["function_calls"],
+            imports=record["imports"],
+        )
+
+        if self.blob_content:
+            self.attach_blob(file_path, record["content_hash"], content)
 
         # Create Function nodes (with full code) and link them to the File node
-        for func in functions:
+        for func in record["functions"]:
             self.create_function_node(file_path, func)
 
         # Create Package nodes and link them to the File node
-        for pkg in packages:
+        for pkg in record["packages"]:
             self.create_package_node(file_path, pkg)
 
-        # Save the extracted data locally for creating cross-file relationships later
-        self.imported_data[file_path] = {
-            "filename": filename,
-            "functions": functions,
-            "function_calls": function_calls,
-            "packages": packages,
-            "language": language,
+        # Drop functions and packages the file no longer has
+        if self.changed_symbols.get(file_path, {}).get("existed"):
+            self.remove_stale_nodes(file_path, record)
+
+        rows = 1 + len(record["functions"]) + len(record["packages"])
+        self.record_write(rows, time.perf_counter() - start)
+
+    def queue_record(self, file_path, content, record):
+        """Buffers a parsed file for the next batched flush."""
+        self.pending_rows["files"].append(
+            {
+                "path": file_path,
+                "filename": record["filename"],
+                "content": None if self.blob_content else content,
+                "language": record["language"],
+                "content_hash": record["content_hash"],
+                "function_calls": record["function_calls"],
+                "imports": record["imports"],
+            }
+        )
+        self.pending_rows["functions"].extend(
+            self.function_row(file_path, func) for func in record["functions"]
+        )
+        self.pending_rows["packages"].extend(
+            {"file": file_path, "name": pkg} for pkg in record["packages"]
+        )
+        if self.changed_symbols.get(file_path, {}).get("existed"):
+            self.pending_rows["stale"].append(self._stale_row(file_path, record))
+        if self.blob_content:
+            self.pending_rows["blobs"].append(
+                {"path": file_path, "hash": record["content_hash"], "content": content}
+            )
+        self.pending_files += 1
+        if self.pending_files >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes all buffered rows to storage in a single transaction (UNWIND queries on Neo4j).
+        Does nothing when no rows are pending. A failed write is logged and re-raised, so
+        the import it belongs to fails instead of reporting files that were never written.
+        """
+        if not self.pending_files:
+            return
+        rows = self.pending_rows
+        file_count = self.pending_files
+        self.pending_rows = self._empty_rows()
+        self.pending_files = 0
+
+        row_count = sum(len(batch) for batch in rows.values())
+        start = time.perf_counter()
+        try:
+            rows["new_blobs"], rows["blobs"] = self._blob_rows(rows["blobs"])
+            with self.store.timed("write_batch"):
+                self.store.write_batch(rows, self.project_name)
+            self.known_blobs.update(link["hash"] for link in rows["blobs"])
+        except Exception as e:
+            logger.error(f"Error flushing batch of {file_count} files: {e}")
+            raise
+        elapsed = time.perf_counter() - start
+        self.record_write(row_count, elapsed)
+        logger.info(
+            f"Flushed {row_count} rows for {file_count} files in {elapsed:.2f}s "
+            f"({self._rate(row_count, elapsed):.0f} rows/sec)"
+        )
+
+    @staticmethod
+    def _empty_rows():
+        return {"files": [], "functions": [], "packages": [], "stale": [], "blobs": []}
+
+    def _blob_rows(self, blobs):
+        """
+        Splits buffered (path, hash, content) rows into compressed Blob rows for the
+        contents not yet stored in the database and (path, hash) rows linking files to them.
+        Contents that are already stored are never compressed or sent again. The hashes
+        only become known_blobs once the batch holding them is written.
+        """
+        unknown = {b["hash"]: b["content"] for b in blobs if b["hash"] not in self.known_blobs}
+        existing = self.existing_blobs(list(unknown))
+        new_blobs = [
+            self._blob_row(content_hash, content)
+            for content_hash, content in unknown.items()
+            if content_hash not in existing
+        ]
+        links = [{"path": b["path"], "hash": b["hash"]} for b in blobs]
+        return new_blobs, links
+
+    @staticmethod
+    def _blob_row(content_hash, content):
+        return {"hash": content_hash, "data": compress_content(content), "size": len(content)}
+
+    def existing_blobs(self, hashes):
+        """Returns the subset of the given content hashes that already have a Blob node."""
+        if not hashes:
+            return set()
+        with self.store.timed("existing_blobs"):
+            return self.store.existing_blobs(hashes)
+
+    def attach_blob(self, file_path, content_hash, content):
+        """Stores the content as a Blob node unless it already exists and links the File to it."""
+        try:
+            if content_hash not in self.known_blobs:
+                if content_hash not in self.existing_blobs([content_hash]):
+                    with self.store.timed("write_blobs"):
+                        self.store.write_blobs([self._blob_row(content_hash, content)])
+                self.known_blobs.add(content_hash)
+            with self.store.timed("link_blobs"):
+                self.store.link_blobs([{"path": file_path, "hash": content_hash}])
+            logger.debug(f"Linked file {file_path} to blob {content_hash}")
+        except Exception as e:
+            logger.error(f"Error storing blob for file {file_path}: {e}")
+
+    @staticmethod
+    def _stale_row(file_path, record):
+        return {
+            "path": file_path,
+            "functions": [_qualname(f) for f in record["functions"]],
+            "packages": record["packages"],
         }
 
-        logger.info(f"Imported data from file: {file_path}")
+    def record_write(self, rows, seconds):
+        """Adds a write to the throughput counters."""
+        self.write_stats["rows"] += rows
+        self.write_stats["seconds"] += seconds
+
+    def write_throughput(self):
+        """Returns the rows written so far, the time spent writing them and the resulting rows/sec."""
+        rows = self.write_stats["rows"]
+        seconds = self.write_stats["seconds"]
+        return {"rows": rows, "seconds": seconds, "rows_per_sec": self._rate(rows, seconds)}
+
+    @staticmethod
+    def _rate(rows, seconds):
+        return rows / seconds if seconds > 0 else 0.0
 
     def detect_language(self, ext):
         """Detects the programming language based on file extension."""
@@ -139,172 +653,273 @@ class KnowledgeGraphImporter:
             return self.extract_generic_functions(content)
 
     def extract_python_functions(self, content):
-        """Extracts Python functions (name and code) using indentation."""
+        """
+        Extracts Python functions, async functions and methods, and with python_ast classes.
+        Each record carries the name, kind, qualified name, line span, character offsets
+        and the code sliced out of the content. By default definitions are found by
+        indentation; with python_ast they come from a single ast parse.
+        """
+        if self.python_ast:
+            return self._extract_python_functions_ast(content)
+        return self._extract_python_functions_lines(content)
+
+    def _extract_python_functions_lines(self, content):
+        """
+        Extracts Python functions and methods by indentation: a def ends before the next
+        non-blank line that is not indented deeper than its header. Lines inside strings
+        spanning several lines neither start nor end a definition, and one-line decorators
+        directly above a def belong to it. Classes are tracked for the qualified names and
+        kinds of their methods but, unlike with python_ast, not extracted themselves.
+        """
+        strings = python_string_spans(content)
+        string_starts = [start for start, _ in strings]
+
+        def string_end(offset):
+            """Returns the end of the multi-line string containing offset, or None."""
+            index = bisect.bisect_right(string_starts, offset) - 1
+            if index >= 0 and offset < strings[index][1]:
+                return strings[index][1]
+            return None
+
+        functions = []
+        parents = []  # Records of the enclosing definitions
+        indents = []  # and the indentation of their headers
+        line, position = 1, 0
+        matches = heapq.merge(
+            PYTHON_DEF.finditer(content),
+            PYTHON_CLASS.finditer(content),
+            key=lambda match: match.start(),
+        )
+        for match in matches:
+            start = match.start()
+            line_start = content.rfind("\n", 0, start) + 1
+            prefix = content[line_start:start]
+            keyword = match.group(1)
+            if not prefix or prefix.isspace():
+                indent = len(prefix)
+            elif keyword == "def" and prefix.split() == ["async"] and prefix[-1].isspace():
+                indent = len(prefix) - len(prefix.lstrip())
+                start, keyword = line_start + indent, "async def"
+            else:
+                continue  # The keyword does not start the line
+            if strings and string_end(start):
+                continue  # The keyword is text inside a docstring
+            while line_start > 0:
+                # Decorators on the lines above, at the same indentation, are part of the def
+                above = content.rfind("\n", 0, line_start - 1) + 1
+                if content[above + indent : above + indent + 1] != "@" or (
+                    indent and not content[above : above + indent].isspace()
+                ):
+                    break
+                line_start = above
+                start = above + indent
+            while parents and (indents[-1] >= indent or parents[-1]["end"] <= start):
+                parents.pop()
+                indents.pop()
+            block_end = _python_block_end(indent).search(content, match.end())
+            while block_end and strings:
+                # A line that starts inside a string does not end the block
+                resume = string_end(block_end.end())
+                if resume is None:
+                    break
+                block_end = _python_block_end(indent).search(content, resume)
+            end = block_end.start() if block_end else len(content)
+            while end > start and content[end - 1] in " \t\r\n":
+                end -= 1
+            line += content.count("\n", position, start)
+            position = start
+            if keyword == "class":
+                parents.append({"name": match.group(2), "kind": "class", "end": end})
+                indents.append(indent)
+                continue
+            record = _python_record(
+                content,
+                match.group(2),
+                _python_kind_from_keyword(keyword, parents),
+                parents,
+                line,
+                line + content.count("\n", start, end),
+                start,
+                end,
+            )
+            functions.append(record)
+            parents.append(record)
+            indents.append(indent)
+        return functions
+
+    def _extract_python_functions_ast(self, content):
+        """
+        Extracts Python definitions in a single ast parse, with their offsets including
+        decorators and their metrics computed from the tree.
+        Falls back to a tokenize-based scan when the content is not valid Python 3.
+        """
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return self._extract_python_functions_tokenize(content)
+
+        starts = line_starts(content)
+        ascii_only = content.isascii()
+        functions = []
+
+        def offset(lineno, col_offset):
+            start = starts[lineno - 1]
+            if not ascii_only:
+                # ast columns are UTF-8 byte offsets; convert them to characters
+                line = content[start : start + col_offset]
+                col_offset = len(
+                    line.encode("utf-8")[:col_offset].decode("utf-8", "ignore")
+                )
+            return start + col_offset
+
+        def visit(statements, parents):
+            for node in statements:
+                if isinstance(node, _PYTHON_DEFINITIONS):
+                    first = node.decorator_list[0] if node.decorator_list else node
+                    start = offset(first.lineno, first.col_offset)
+                    if node.decorator_list:
+                        # Decorator nodes start after the '@'
+                        start = content.rfind("@", starts[first.lineno - 1], start)
+                    end = offset(node.end_lineno, node.end_col_offset)
+                    functions.append(
+                        _python_record(
+                            content,
+                            node.name,
+                            _python_kind(node, parents),
+                            parents,
+                            first.lineno,
+                            node.end_lineno,
+                            start,
+                            end,
+                        )
+                    )
+                    functions[-1].update(python_metrics(node, functions[-1]["code"]))
+                    visit(node.body, parents + [functions[-1]])
+                else:
+                    for field in _PYTHON_BLOCK_FIELDS:
+                        block = getattr(node, field, None)
+                        if block:
+                            visit(block, parents)
+
+        visit(tree.body, [])
+        return functions
+
+    def _extract_python_functions_tokenize(self, content):
+        """
+        Extracts Python definitions from the token stream for content that does not parse.
+        A definition ends where the next logical line at the same or a shallower depth begins.
+        """
+        starts = line_starts(content)
         functions = []
-        lines = content.splitlines()
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            stripped_line = line.lstrip()
-            if stripped_line.startswith("def "):
-                func_name_match = re.match(r"def\s+(\w+)\s*\(", stripped_line)
-                if not func_name_match:
-                    i += 1
+        open_defs = []  # (record, depth) for definitions whose end is not known yet
+        depth = 0
+        at_line_start = True
+        last_line_end = 0  # Offset where the previous logical line ends
+        decorator = None  # (offset, lineno) of the first pending decorator
+        header = None  # (keyword, offset, lineno) while waiting for a definition name
+
+        def close(until_depth):
+            while open_defs and open_defs[-1][1] >= until_depth:
+                record, _ = open_defs.pop()
+                end = max(last_line_end, record["start"])
+                record["end"] = end
+                record["end_line"] = bisect.bisect_right(starts, end)
+                record["code"] = content[record["start"] : end]
+
+        try:
+            for tok in tokenize.generate_tokens(io.StringIO(content).readline):
+                if tok.type == tokenize.INDENT:
+                    depth += 1
+                elif tok.type == tokenize.DEDENT:
+                    depth -= 1
+                elif tok.type == tokenize.NEWLINE:
+                    last_line_end = starts[tok.start[0] - 1] + tok.start[1]
+                    at_line_start = True
+                    header = None
+                elif tok.type in (tokenize.NL, tokenize.COMMENT, tokenize.ENDMARKER):
                     continue
-                func_name = func_name_match.group(1)
-                function_lines = [line]
-                i += 1
-                base_indent = len(line) - len(stripped_line)
-                while i < len(lines):
-                    next_line = lines[i]
-                    if next_line.strip() == "":
-                        function_lines.append(next_line)
-                        i += 1
+                elif at_line_start:
+                    at_line_start = False
+                    close(depth)
+                    position = starts[tok.start[0] - 1] + tok.start[1]
+                    if tok.string == "@":
+                        decorator = decorator or (position, tok.start[0])
                         continue
-                    current_indent = len(next_line) - len(next_line.lstrip())
-                    if current_indent > base_indent:
-                        function_lines.append(next_line)
-                        i += 1
+                    if tok.string in ("def", "class", "async"):
+                        start, lineno = decorator or (position, tok.start[0])
+                        header = (tok.string, start, lineno)
+                    decorator = None
+                elif header and header[0] == "async":
+                    if tok.string == "def":
+                        header = ("async def",) + header[1:]
                     else:
-                        break
-                function_code = "\n".join(function_lines)
-                functions.append({"name": func_name, "code": function_code})
-            else:
-                i += 1
+                        header = None
+                elif header and tok.type == tokenize.NAME:
+                    keyword, start, lineno = header
+                    parents = [record for record, _ in open_defs]
+                    kind = _python_kind_from_keyword(keyword, parents)
+                    record = _python_record(
+                        content, tok.string, kind, parents, lineno, lineno, start, start
+                    )
+                    functions.append(record)
+                    open_defs.append((record, depth))
+                    header = None
+                else:
+                    header = None
+        except (tokenize.TokenError, SyntaxError) as e:
+            logger.warning(f"Tokenize fallback stopped early: {e}")
+        close(0)
         return functions
 
     def extract_cs_functions(self, content):
         """Extracts C# functions using a regex and brace-matching."""
-        functions = []
-        pattern = re.compile(
-            r"(public|private|protected)\s+(static\s+)?\S+\s+(\w+)\s*\([^)]*\)\s*{"
-        )
-        for match in pattern.finditer(content):
-            func_name = match.group(3)
-            i = match.end() - 1
-            brace_count = 1
-            while i < len(content) and brace_count > 0:
-                i += 1
-                if i >= len(content):
-                    break
-                if content[i] == "{":
-                    brace_count += 1
-                elif content[i] == "}":
-                    brace_count -= 1
-            function_code = (
-                content[match.start() : i + 1]
-                if i < len(content)
-                else content[match.start() :]
-            )
-            functions.append({"name": func_name, "code": function_code})
-        return functions
+        return CS_LEXER.extract_functions(content)
 
     def extract_java_functions(self, content):
         """Extracts Java methods using a regex and brace matching."""
-        functions = []
-        pattern = re.compile(
-            r"(public|private|protected)\s+(static\s+)?\S+\s+(\w+)\s*\([^)]*\)\s*{"
-        )
-        for match in pattern.finditer(content):
-            func_name = match.group(3)
-            i = match.end() - 1
-            brace_count = 1
-            while i < len(content) and brace_count > 0:
-                i += 1
-                if i >= len(content):
-                    break
-                if content[i] == "{":
-                    brace_count += 1
-                elif content[i] == "}":
-                    brace_count -= 1
-            function_code = (
-                content[match.start() : i + 1]
-                if i < len(content)
-                else content[match.start() :]
-            )
-            functions.append({"name": func_name, "code": function_code})
-        return functions
+        return JAVA_LEXER.extract_functions(content)
 
     def extract_javascript_functions(self, content):
         """Extracts JavaScript/TypeScript functions declared with the 'function' keyword."""
-        functions = []
-        pattern = re.compile(r"function\s+(\w+)\s*\([^)]*\)\s*{")
-        for match in pattern.finditer(content):
-            func_name = match.group(1)
-            i = match.end() - 1
-            brace_count = 1
-            while i < len(content) and brace_count > 0:
-                i += 1
-                if i >= len(content):
-                    break
-                if content[i] == "{":
-                    brace_count += 1
-                elif content[i] == "}":
-                    brace_count -= 1
-            function_code = (
-                content[match.start() : i + 1]
-                if i < len(content)
-                else content[match.start() :]
-            )
-            functions.append({"name": func_name, "code": function_code})
-        return functions
+        return JAVASCRIPT_LEXER.extract_functions(content)
 
     def extract_cpp_functions(self, content):
         """Extracts C/C++ functions using a generic regex and brace matching."""
-        functions = []
-        pattern = re.compile(r"(?:[\w:\*&<>\s]+)\s+(\w+)\s*\([^)]*\)\s*{")
-        for match in pattern.finditer(content):
-            func_name = match.group(1)
-            i = match.end() - 1
-            brace_count = 1
-            while i < len(content) and brace_count > 0:
-                i += 1
-                if i >= len(content):
-                    break
-                if content[i] == "{":
-                    brace_count += 1
-                elif content[i] == "}":
-                    brace_count -= 1
-            function_code = (
-                content[match.start() : i + 1]
-                if i < len(content)
-                else content[match.start() :]
-            )
-            functions.append({"name": func_name, "code": function_code})
-        return functions
+        return CPP_LEXER.extract_functions(content)
 
     def extract_generic_functions(self, content):
         """Fallback extractor for functions using a generic pattern."""
-        functions = []
-        pattern = re.compile(r"function\s+(\w+)\s*\([^)]*\)\s*{")
-        for match in pattern.finditer(content):
-            func_name = match.group(1)
-            i = match.end() - 1
-            brace_count = 1
-            while i < len(content) and brace_count > 0:
-                i += 1
-                if i >= len(content):
-                    break
-                if content[i] == "{":
-                    brace_count += 1
-                elif content[i] == "}":
-                    brace_count -= 1
-            function_code = (
-                content[match.start() : i + 1]
-                if i < len(content)
-                else content[match.start() :]
-            )
-            functions.append({"name": func_name, "code": function_code})
-        return functions
+        return GENERIC_LEXER.extract_functions(content)
+
+    def add_function_metrics(self, functions, ext):
+        """
+        Adds the static metrics (see complexity.py) to extracted functions that do not have
+        them yet. Python parsed with ast gets them from its tree; everything else is scanned
+        lexically.
+        """
+        if ext == ".py":
+            scanner = PYTHON_SCANNER
+        elif ext in [".cs", ".java", ".js", ".ts", ".cpp", ".c", ".h"]:
+            scanner = BRACE_SCANNER
+        else:
+            scanner = GENERIC_SCANNER
+        for func in functions:
+            if "cyclomatic" not in func:
+                func.update(scanner.metrics(func["code"], func["name"]))
 
     def extract_packages(self, content, ext):
-        """Extracts package or module dependencies from the content."""
+        """
+        Extracts package or module dependencies from the content. Imports that can only
+        refer to the project's own files (relative imports, quoted includes) are left to
+        extract_imports; absolute ones that turn out to be local are dropped later by
+        process_import_relationships.
+        """
         packages = set()
         if ext == ".py":
-            import_pattern = r"^\s*import\s+(\w+)"
-            from_pattern = r"^\s*from\s+(\w+)"
-            packages.update(re.findall(import_pattern, content, re.MULTILINE))
-            packages.update(re.findall(from_pattern, content, re.MULTILINE))
+            for specifier in extract_imports(content, ext):
+                package = external_package(specifier, ext)
+                if package:
+                    packages.add(package)
         elif ext == ".cs":
             pattern = r"^\s*using\s+([\w\.]+)\s*;"
             packages.update(re.findall(pattern, content, re.MULTILINE))
@@ -316,8 +931,9 @@ class KnowledgeGraphImporter:
             packages.update(re.findall(import_pattern, content, re.MULTILINE))
             require_pattern = r'require\([\'"]([\w\/\.-]+)[\'"]\)'
             packages.update(re.findall(require_pattern, content))
+            packages = {p for p in packages if not p.startswith((".", "/"))}
         elif ext in [".cpp", ".c", ".h"]:
-            pattern = r'^\s*#include\s+[<"]([\w\.\/]+)[>"]'
+            pattern = r"^\s*#include\s+<([\w\.\/]+)>"
             packages.update(re.findall(pattern, content, re.MULTILINE))
         return list(packages)
 
@@ -327,54 +943,67 @@ class KnowledgeGraphImporter:
         calls = [call for call in all_calls if call not in defined_functions]
         return list(set(calls))
 
-    def create_file_node(self, filename, file_path, content, language):
+    def create_file_node(
+        self,
+        filename,
+        file_path,
+        content,
+        language,
+        content_hash=None,
+        function_calls=None,
+        imports=None,
+    ):
         """
-        Creates or updates a File node in Neo4j with the given properties.
+        Creates or updates a File node with the given properties.
         Also creates a relationship from the Project node to this File node (if a project is set).
         """
-        query = (
-            "MERGE (f:File {path: $file_path}) "
-            "SET f.filename = $filename, f.content = $content, f.language = $language "
-            "WITH f "
-            "OPTIONAL MATCH (p:Project {name: $project_name}) "
-            "FOREACH (ignoreMe IN CASE WHEN p IS NULL THEN [] ELSE [1] END | "
-            "   MERGE (p)-[:CONTAINS_FILE]->(f) )"
-        )
+        row = {
+            "path": file_path,
+            "filename": filename,
+            "content": content,
+            "language": language,
+            "content_hash": content_hash,
+            "function_calls": function_calls,
+            "imports": imports or [],
+        }
         try:
-            self.driver.execute_query(
-                query,
-                filename=filename,
-                file_path=file_path,
-                content=content,
-                language=language,
-                project_name=self.project_name,
-                database_=self.database,
-            )
-            logger.info(f"Created/updated File node: {filename}")
+            with self.store.timed("write_file"):
+                self.store.write_file(row, self.project_name)
+            logger.debug(f"Created/updated File node: {filename}")
         except Exception as e:
             logger.error(f"Error creating File node for {filename}: {e}")
 
+    def function_row(self, file_path, function):
+        """
+        Returns the properties stored on a Function node, including its static metrics.
+        The code is left out in compact mode; readers slice it from File.content using the
+        start/end character offsets.
+        """
+        row = {
+            "file": file_path,
+            "name": function["name"],
+            "qualname": _qualname(function),
+            "kind": function.get("kind") or "function",
+            "code": None if self.compact else function["code"],
+            "start": function.get("start"),
+            "end": function.get("end"),
+            "start_line": function.get("start_line"),
+            "end_line": function.get("end_line"),
+            "calls": function.get("calls") or [],
+        }
+        row.update((metric, function.get(metric)) for metric in METRICS)
+        return row
+
     def create_function_node(self, file_path, function):
         """
-        Creates a Function node (with name and code) and links it to the corresponding File node.
+        Creates a Function node (with name, span and code) and links it to the corresponding
+        File node.
         """
         function_name = function["name"]
-        function_code = function["code"]
-        query = (
-            "MATCH (f:File {path: $file_path}) "
-            "MERGE (fn:Function {name: $function_name, file: $file_path}) "
-            "SET fn.code = $function_code "
-            "MERGE (f)-[:CONTAINS_FUNCTION]->(fn)"
-        )
         try:
-            self.driver.execute_query(
-                query,
-                file_path=file_path,
-                function_name=function_name,
-                function_code=function_code,
-                database_=self.database,
-            )
-            logger.info(f"Created Function node: {function_name} in {file_path}")
+            with self.store.timed("write_function"):
+                self.store.write_function(self.function_row(file_path, function))
+            logger.debug(f"Created Function node: {function_name} in {file_path}")
         except Exception as e:
             logger.error(
                 f"Error creating Function node {function_name} in {file_path}: {e}"
@@ -384,42 +1013,39 @@ class KnowledgeGraphImporter:
         """
         Creates a Package node and links it to the corresponding File node.
         """
-        query = (
-            "MATCH (f:File {path: $file_path}) "
-            "MERGE (p:Package {name: $package_name}) "
-            "MERGE (f)-[:USES_PACKAGE]->(p)"
-        )
         try:
-            self.driver.execute_query(
-                query,
-                file_path=file_path,
-                package_name=package_name,
-                database_=self.database,
-            )
-            logger.info(f"Created Package node: {package_name} for {file_path}")
+            with self.store.timed("write_package"):
+                self.store.write_package(file_path, package_name)
+            logger.debug(f"Created Package node: {package_name} for {file_path}")
         except Exception as e:
             logger.error(
                 f"Error creating Package node {package_name} for {file_path}: {e}"
             )
 
+    def remove_stale_nodes(self, file_path, record):
+        """
+        Deletes the Function nodes and USES_PACKAGE relationships of a re-imported file
+        that are no longer present in its content.
+        """
+        rows = [self._stale_row(file_path, record)]
+        try:
+            with self.store.timed("remove_stale"):
+                self.store.remove_stale(rows)
+            logger.debug(f"Removed stale nodes for {file_path}")
+        except Exception as e:
+            logger.error(f"Error removing stale nodes for {file_path}: {e}")
+
     def create_file_relationship(self, from_path, to_path, function_name):
         """
         Creates a relationship between two File nodes indicating that
         a function call in the first file refers to a function defined in the second file.
         """
-        query = (
-            "MATCH (f1:File {path: $from_path}), (f2:File {path: $to_path}) "
-            "MERGE (f1)-[:CALLS {function: $function_name}]->(f2)"
-        )
         try:
-            self.driver.execute_query(
-                query,
-                from_path=from_path,
-                to_path=to_path,
-                function_name=function_name,
-                database_=self.database,
-            )
-            logger.info(
+            with self.store.timed("write_call_edges"):
+                self.store.write_call_edges(
+                    [{"from": from_path, "to": to_path, "function": function_name}]
+                )
+            logger.debug(
                 f"Created CALLS relationship from {from_path} to {to_path} for function {function_name}"
             )
         except Exception as e:
@@ -427,56 +1053,325 @@ class KnowledgeGraphImporter:
                 f"Error creating CALLS relationship from {from_path} to {to_path} for function {function_name}: {e}"
             )
 
-    def process_directory(self, directory_path):
+    def process_directory(self, directory_path, workers=None):
         """
         Recursively processes all files in the given directory.
         After importing individual files, it creates cross-file relationships based on function calls.
+        With more than one worker, files are parsed in a process pool while this
+        process acts as the single writer to storage.
         """
-        files = glob.glob(os.path.join(directory_path, "**/*"), recursive=True)
-        for file_path in files:
-            if os.path.isfile(file_path):
+        workers = self.workers if workers is None else workers
+        file_paths = self._iter_files(directory_path)
+        if workers > 1:
+            self._import_files_parallel(file_paths, workers)
+        else:
+            for file_path in file_paths:
                 self.import_data(file_path)
+        # Write any files still buffered in batched mode before resolving calls.
+        self.flush()
+        throughput = self.write_throughput()
+        logger.info(
+            f"Wrote {throughput['rows']} rows in {throughput['seconds']:.2f}s "
+            f"({throughput['rows_per_sec']:.0f} rows/sec)"
+        )
+        # Create inter-file relationships based on function calls and imports.
+        self.process_function_relationships()
+        self.process_import_relationships()
+
+    def _iter_files(self, directory_path):
+        """Lazily yields the files below directory_path, skipping directories."""
+        for file_path in glob.iglob(
+            os.path.join(directory_path, "**/*"), recursive=True
+        ):
+            if os.path.isfile(file_path):
+                yield file_path
             else:
                 logger.warning(f"Skipped non-file: {file_path}")
-        # Create inter-file relationships based on function calls.
-        self.process_function_relationships()
+
+    def _import_files_parallel(self, file_paths, workers, max_pending=None):
+        """
+        Parses files in a pool of worker processes and writes the results as they complete.
+        At most max_pending files are in flight at once so memory stays bounded on large trees.
+        """
+        max_pending = max_pending or workers * 4
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                try:
+                    file_path, content, record, seconds = future.result()
+                except Exception as e:
+                    logger.error(f"Error parsing file in worker: {e}")
+                    continue
+                if record is not None:
+                    # Metrics recorded in the worker process would be lost
+                    PARSE_SECONDS.observe(seconds, language=record["language"])
+                if content is not None:
+                    self.import_content(file_path, content, record)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_parse_worker,
+            initargs=(self.python_ast,),
+        ) as executor:
+            for file_path in file_paths:
+                if len(pending) >= max_pending:
+                    drain(FIRST_COMPLETED)
+                known_hash = None
+                if self.incremental:
+                    known = self.get_known_files().get(file_path)
+                    known_hash = known["content_hash"] if known else None
+                pending.add(
+                    executor.submit(_parse_file_worker, file_path, known_hash)
+                )
+            if pending:
+                drain(ALL_COMPLETED)
 
     def process_function_relationships(self):
         """
         Iterates through the imported data and creates a relationship between files
         when a function call in one file refers to a function defined in another file.
+        Calls are resolved through a symbol index (function name -> defining files)
+        and the resulting CALLS edges are written in bulk.
+        Each function's own calls are resolved the same way into Function-level CALLS
+        edges, after which the fan-in of the project's functions is recounted.
         """
-        file_paths = list(self.imported_data.keys())
-        for file_a in file_paths:
-            calls = self.imported_data[file_a].get("function_calls", [])
-            for func in calls:
-                for file_b in file_paths:
-                    if file_a == file_b:
-                        continue
-                    defined_funcs = [
-                        f["name"]
-                        for f in self.imported_data[file_b].get("functions", [])
-                    ]
-                    if func in defined_funcs:
-                        self.create_file_relationship(file_a, file_b, func)
+        symbol_index = self.build_symbol_index()
+        if self.incremental:
+            changed = self.changed_symbols
+            self.changed_symbols = {}
+            self.delete_stale_relationships(changed)
+            added_definitions = self._added_definitions(changed)
+            edges = self._changed_call_edges(symbol_index, changed, added_definitions)
+            function_edges = self._function_call_edges(
+                symbol_index, changed, added_definitions
+            )
+        else:
+            edges = []
+            for file_a, data in self.imported_data.items():
+                for func in data.get("function_calls", []):
+                    for file_b in symbol_index.get(func, ()):
+                        if file_b != file_a:
+                            edges.append({"from": file_a, "to": file_b, "function": func})
+            self.delete_function_relationships(list(self.imported_data))
+            function_edges = self._function_call_edges(symbol_index)
+        self.create_file_relationships(edges)
+        self.create_function_relationships(function_edges)
+        self.update_fan_in()
+
+    @staticmethod
+    def _added_definitions(changed):
+        """Maps each function name that changed files newly define to those files."""
+        added_definitions = {}
+        for file_path, change in changed.items():
+            for name in change["added"]:
+                added_definitions.setdefault(name, []).append(file_path)
+        return added_definitions
+
+    def _changed_call_edges(self, symbol_index, changed, added_definitions):
+        """
+        Returns the file CALLS edges to recreate after the stale ones were deleted: every
+        call made by a changed file, and calls from unchanged files to newly defined names.
+        """
+        edges = []
+        for file_a, data in self.imported_data.items():
+            targets = symbol_index if file_a in changed else added_definitions
+            for func in data.get("function_calls", []):
+                for file_b in targets.get(func, ()):
+                    if file_b != file_a:
+                        edges.append({"from": file_a, "to": file_b, "function": func})
+        logger.info(
+            f"Recomputing CALLS for {len(changed)} changed files "
+            f"of {len(self.imported_data)}"
+        )
+        return edges
+
+    def _function_call_edges(self, symbol_index, changed=None, added_definitions=None):
+        """
+        Resolves the calls made by each function into Function CALLS edges. A call goes to
+        the functions of that name in the caller's own file if there are any, otherwise to
+        every function of that name in other files; functions are told apart by qualname,
+        so a call to a method name reaches that method in every class defining it.
+        With changed files (incremental mode), only their functions' calls are resolved,
+        plus calls from unchanged files to the names they newly define.
+        """
+        edges = []
+        for file_path, data in self.imported_data.items():
+            full = changed is None or file_path in changed
+            for func in data.get("functions", []):
+                for callee in func.get("calls", ()):
+                    defined_in = symbol_index.get(callee, {})
+                    if file_path in defined_in:
+                        targets = [file_path] if full else ()
+                    elif full:
+                        targets = defined_in
+                    else:
+                        targets = added_definitions.get(callee, ())
+                    edges.extend(
+                        {
+                            "file": file_path,
+                            "qualname": _qualname(func),
+                            "callee_file": target,
+                            "callee_qualname": qualname,
+                        }
+                        for target in targets
+                        for qualname in defined_in.get(target, ())
+                    )
+        return edges
+
+    def delete_stale_relationships(self, changed):
+        """
+        Deletes the outgoing CALLS edges of changed files and the incoming CALLS edges
+        for functions those files no longer define, and the outgoing Function CALLS edges
+        of their functions.
+        """
+        rows = [
+            {"path": file_path, "removed": list(change["removed"])}
+            for file_path, change in changed.items()
+            if change["existed"]
+        ]
+        if not rows:
+            return
+        try:
+            with self.store.timed("delete_call_edges"):
+                self.store.delete_call_edges(rows)
+        except Exception as e:
+            logger.error(f"Error deleting stale CALLS relationships: {e}")
+        self.delete_function_relationships([row["path"] for row in rows])
+
+    def delete_function_relationships(self, paths):
+        """Deletes the outgoing Function CALLS edges of the functions in the given files."""
+        if not paths:
+            return
+        try:
+            with self.store.timed("delete_function_calls"):
+                self.store.delete_function_calls(paths)
+        except Exception as e:
+            logger.error(f"Error deleting Function CALLS relationships: {e}")
+
+    def build_symbol_index(self):
+        """
+        Builds an inverted index mapping each function name to the files that define it,
+        and in each file to the qualnames of the functions with that name.
+        """
+        symbol_index = {}
+        for file_path, data in self.imported_data.items():
+            for func in data.get("functions", []):
+                files = symbol_index.setdefault(func["name"], {})
+                files.setdefault(file_path, []).append(_qualname(func))
+        return symbol_index
+
+    def create_file_relationships(self, edges, chunk_size=1000):
+        """
+        Creates CALLS relationships between File nodes in bulk.
+        Each edge is a dict with "from", "to" and "function" keys.
+        """
+        start = time.perf_counter()
+        for i in range(0, len(edges), chunk_size):
+            chunk = edges[i : i + chunk_size]
+            try:
+                with self.store.timed("write_call_edges"):
+                    self.store.write_call_edges(chunk)
+            except Exception as e:
+                logger.error(f"Error creating {len(chunk)} CALLS relationships: {e}")
+        if edges:
+            self.record_write(len(edges), time.perf_counter() - start)
+            logger.info(f"Created {len(edges)} CALLS relationships")
+
+    def process_import_relationships(self, chunk_size=1000):
+        """
+        Resolves the imports of the imported files to the project files they refer to
+        and writes them as IMPORTS edges between File nodes, replacing the files' previous
+        ones. Files importing a Python module or Java class that resolved locally no longer
+        use it as a Package, so Package nodes stand for external dependencies only.
+        """
+        resolver = ImportResolver(self.imported_data)
+        edges = []
+        local_packages = []
+        for file_path, data in self.imported_data.items():
+            ext = os.path.splitext(file_path)[1].lower()
+            targets = set()
+            packages = set()
+            for specifier in data.get("imports", []):
+                target = resolver.resolve(file_path, specifier)
+                if target is None:
+                    continue
+                if target != file_path:
+                    targets.add(target)
+                package = external_package(specifier, ext)
+                if package:
+                    packages.add(package)
+            edges.extend({"from": file_path, "to": target} for target in sorted(targets))
+            local_packages.extend({"file": file_path, "name": name} for name in packages)
+
+        start = time.perf_counter()
+        try:
+            with self.store.timed("delete_imports"):
+                self.store.delete_imports(list(self.imported_data))
+            for i in range(0, len(edges), chunk_size):
+                with self.store.timed("write_imports"):
+                    self.store.write_imports(edges[i : i + chunk_size])
+            if local_packages:
+                with self.store.timed("remove_package_uses"):
+                    self.store.remove_package_uses(local_packages)
+        except Exception as e:
+            logger.error(f"Error writing IMPORTS relationships: {e}")
+            return
+        if edges:
+            self.record_write(len(edges), time.perf_counter() - start)
+        logger.info(
+            f"Resolved {len(edges)} IMPORTS relationships across "
+            f"{len(self.imported_data)} files"
+        )
+
+    def create_function_relationships(self, edges, chunk_size=1000):
+        """
+        Creates CALLS relationships between Function nodes in bulk. Each edge is a dict
+        with the caller's "file" and "qualname" and the callee's "callee_file" and
+        "callee_qualname".
+        """
+        start = time.perf_counter()
+        for i in range(0, len(edges), chunk_size):
+            chunk = edges[i : i + chunk_size]
+            try:
+                with self.store.timed("write_function_calls"):
+                    self.store.write_function_calls(chunk)
+            except Exception as e:
+                logger.error(f"Error creating {len(chunk)} Function CALLS relationships: {e}")
+        if edges:
+            self.record_write(len(edges), time.perf_counter() - start)
+            logger.info(f"Created {len(edges)} Function CALLS relationships")
+
+    def update_fan_in(self):
+        """Recounts the callers of the project's functions once their CALLS edges are written."""
+        try:
+            with self.store.timed("update_fan_in"):
+                self.store.update_fan_in(self.project_name)
+        except Exception as e:
+            logger.error(f"Error updating function fan-in: {e}")
 
     def execute_query(self, query, **kwargs):
         """
-        Executes a custom query with parameters.
+        Executes a custom query (Cypher on Neo4j, SQL on SQLite) with parameters and
+        returns its result, or None if it failed.
         """
         try:
-            self.driver.execute_query(query, **kwargs)
+            result = self.store.execute_query(query, **kwargs)
             logger.info(f"Executed custom query: {query}")
+            return result
         except Exception as e:
             logger.error(f"Error executing custom query: {e}")
+            return None
 
     def delete_all(self):
         """
         Deletes all nodes and relationships from the graph database.
         """
-        query = "MATCH (n) DETACH DELETE n"
         try:
-            self.driver.execute_query(query)
+            self.store.delete_all()
+            self.known_blobs.clear()
             logger.info("Deleted all nodes and relationships.")
         except Exception as e:
             logger.error(f"Error deleting all nodes and relationships: {e}")
@@ -485,9 +1380,40 @@ class KnowledgeGraphImporter:
         """
         Deletes all nodes and relationships related to the current project.
         """
-        query = "MATCH (p:Project {name: $project_name}) DETACH DELETE p"
         try:
-            self.driver.execute_query(query, project_name=self.project_name)
+            self.store.delete_project(self.project_name)
             logger.info(f"Deleted project {self.project_name}")
         except Exception as e:
             logger.error(f"Error deleting project {self.project_name}: {e}")
+
+
+# Parse-only importer used by worker processes of process_directory.
+_worker_importer = None
+
+
+def _init_parse_worker(python_ast=False):
+    """Creates the parse-only importer for a worker process."""
+    global _worker_importer
+    _worker_importer = KnowledgeGraphImporter(
+        None, None, None, None, python_ast=python_ast
+    )
+
+
+def _parse_file_worker(file_path, known_hash=None):
+    """
+    Reads and parses a single file in a worker process.
+    Returns (file_path, content, record, parse_seconds). Content is None when the file
+    cannot be read; record is None when the content still matches known_hash and parsing
+    was skipped.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except Exception as e:
+        logger.error(f"Error reading {file_path}: {e}")
+        return file_path, None, None, 0.0
+    if known_hash is not None and content_hash(content) == known_hash:
+        return file_path, content, None, 0.0
+    start = time.perf_counter()
+    record = _worker_importer.parse_content(file_path, content)
+    return file_path, content, record, time.perf_counter() - start
@@ -0,0 +1,132 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from metrics import INGESTION_JOBS
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionJobs:
+    """
+    Runs project ingestion in background worker threads.
+
+    Jobs wait in a bounded queue so bursts of uploads are absorbed without holding
+    an unbounded amount of file data in memory. Each worker owns its own importer,
+    created with importer_factory, and runs run_import(importer, project_name, uploads)
+    for every job it takes. Finished jobs are kept for status polling up to max_finished.
+    """
+
+    def __init__(
+        self, importer_factory, run_import, workers=2, max_pending=16, max_finished=100
+    ):
+        self.importer_factory = importer_factory
+        self.run_import = run_import
+        self.max_finished = max_finished
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.jobs = OrderedDict()  # job_id -> job status, oldest first
+        self.lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(
+                target=self._worker, name=f"ingestion-worker-{i}", daemon=True
+            ).start()
+
+    def submit(self, project_name, uploads):
+        """
+        Queues an ingestion job and returns its id.
+        uploads is a list of (filename, stream) pairs whose data is already in memory.
+        Raises queue.Full when too many jobs are already waiting.
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "project": project_name,
+            "status": "queued",
+            "files_uploaded": len(uploads),
+            "files_parsed": 0,
+            "nodes_written": 0,
+            "elapsed": 0.0,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self.lock:
+            self.queue.put_nowait((job, uploads))
+            self.jobs[job["id"]] = job
+        logger.info(f"Queued ingestion job {job['id']} for project {project_name}")
+        return job["id"]
+
+    def status(self, job_id):
+        """Returns a snapshot of the job's progress, or None for an unknown job."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {k: v for k, v in job.items() if k != "importer"}
+            importer = job.get("importer")
+        if importer is not None:
+            # Live counters of a running job
+            snapshot["files_parsed"] = len(importer.imported_data)
+            snapshot["nodes_written"] = importer.write_stats["rows"]
+        if snapshot["started_at"] is not None:
+            end = snapshot["finished_at"] or time.time()
+            snapshot["elapsed"] = round(end - snapshot["started_at"], 2)
+        return snapshot
+
+    def is_pending(self, project_name):
+        """Returns True if a queued or running job is creating the project."""
+        with self.lock:
+            return any(
+                job["project"] == project_name
+                and job["status"] in ("queued", "running")
+                for job in self.jobs.values()
+            )
+
+    def _worker(self):
+        """Takes jobs from the queue and runs them with this worker's importer."""
+        importer = self.importer_factory()
+        while True:
+            job, uploads = self.queue.get()
+            try:
+                self._run(importer, job, uploads)
+            finally:
+                self.queue.task_done()
+
+    def _run(self, importer, job, uploads):
+        importer.reset()
+        with self.lock:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            job["importer"] = importer
+        try:
+            self.run_import(importer, job["project"], uploads)
+            status, error = "completed", None
+        except Exception as e:
+            logger.error(f"Ingestion job {job['id']} failed: {e}")
+            status, error = "failed", str(e)
+        INGESTION_JOBS.inc(status=status)
+        with self.lock:
+            job.pop("importer")
+            job["status"] = status
+            job["error"] = error
+            job["finished_at"] = time.time()
+            job["elapsed"] = round(job["finished_at"] - job["started_at"], 2)
+            job["files_parsed"] = len(importer.imported_data)
+            job["nodes_written"] = importer.write_stats["rows"]
+            self._evict_finished()
+        logger.info(
+            f"Ingestion job {job['id']} {status} in {job['elapsed']:.2f}s "
+            f"({job['files_parsed']} files, {job['nodes_written']} nodes)"
+        )
+
+    def _evict_finished(self):
+        """Drops the oldest finished jobs beyond max_finished. Caller holds the lock."""
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job["status"] in ("completed", "failed")
+        ]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
@@ -0,0 +1,154 @@
+import re
+import bisect
+
+# Token alternatives shared by the C-family languages. Comments and strings are
+# matched as whole tokens so braces inside them never reach the brace stack.
+LINE_COMMENT = r"//[^\n]*"
+BLOCK_COMMENT = r"/\*.*?(?:\*/|\Z)"
+HASH_COMMENT = r"#[^\n]*"
+TRIPLE_DOUBLE_QUOTED = r'"""[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*(?:"""|\Z)'
+TRIPLE_SINGLE_QUOTED = r"'''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*(?:'''|\Z)"
+DOUBLE_QUOTED = r'"(?:\\.|[^"\\\n])*"?'
+SINGLE_QUOTED = r"'(?:\\.|[^'\\\n])*'?"
+VERBATIM_STRING = r'@"(?:""|[^"])*"?'
+BACKTICK_STRING = r"`(?:\\.|[^`\\])*`?"
+BRACE = r"[{}]"
+# Statements whose header looks like a C function definition: name, parentheses, brace
+CONTROL_KEYWORDS = frozenset(
+    ("if", "else", "for", "while", "do", "switch", "case", "catch", "return", "sizeof")
+)
+
+# Python comments and strings, triple-quoted first so '"""' is not read as an empty string
+PYTHON_TOKEN = re.compile(
+    "|".join(
+        [HASH_COMMENT, TRIPLE_DOUBLE_QUOTED, TRIPLE_SINGLE_QUOTED, DOUBLE_QUOTED, SINGLE_QUOTED]
+    ),
+    re.DOTALL,
+)
+
+
+def line_starts(content):
+    """Returns the character offset at which each line starts, using Python's line endings."""
+    return [0] + [m.end() for m in re.finditer(r"\r\n|\r|\n", content)]
+
+
+def python_string_spans(content):
+    """
+    Returns the (start, end) offsets of the Python strings that span several lines, in
+    order, with end exclusive. Comments and one-line strings are lexed only so that
+    quotes inside them are not taken for the start of a triple-quoted string.
+    """
+    if '"""' not in content and "'''" not in content:
+        return []
+    spans = []
+    for token in PYTHON_TOKEN.finditer(content):
+        start, end = token.span()
+        multiline = content.find("\n", start, end) >= 0
+        if multiline and content.startswith(('"""', "'''"), start):
+            spans.append((start, end))
+    return spans
+
+
+class BraceLexer:
+    """
+    Single-pass lexer that finds function spans in brace-delimited languages.
+
+    The content is tokenized once to pair every code brace with its closing brace and
+    to blank out strings and comments. Function headers are then located with a
+    precompiled regex in the blanked code only, and their bodies resolved by lookup.
+    Header patterns must not backtrack over unbounded runs of words or whitespace;
+    with such a pattern the whole file is processed in linear time no matter how
+    functions nest. Headers whose name is in reserved_names are skipped.
+    """
+
+    def __init__(
+        self,
+        function_pattern,
+        name_group=1,
+        hash_comments=False,
+        verbatim_strings=False,
+        backtick_strings=False,
+        reserved_names=frozenset(),
+    ):
+        self.function_pattern = re.compile(function_pattern)
+        self.name_group = name_group
+        self.reserved_names = reserved_names
+        tokens = [LINE_COMMENT, BLOCK_COMMENT]
+        if hash_comments:
+            tokens.append(HASH_COMMENT)
+        if verbatim_strings:
+            # Must come before DOUBLE_QUOTED so the '@' prefix is honoured
+            tokens.append(VERBATIM_STRING)
+        tokens += [DOUBLE_QUOTED, SINGLE_QUOTED]
+        if backtick_strings:
+            tokens.append(BACKTICK_STRING)
+        tokens.append(BRACE)
+        self.token_pattern = re.compile("|".join(tokens), re.DOTALL)
+
+    def scan(self, content):
+        """
+        Returns (pairs, code). pairs maps the offset of every code '{' to the offset of
+        its matching '}', with unclosed braces mapped to the last offset of the content.
+        code is the content with every string and comment replaced by spaces, so its
+        offsets match the content.
+        """
+        pairs = {}
+        stack = []
+        pieces = []
+        position = 0
+        for token in self.token_pattern.finditer(content):
+            start, end = token.span()
+            if end - start == 1 and content[start] in "{}":
+                if content[start] == "{":
+                    stack.append(start)
+                elif stack:
+                    pairs[stack.pop()] = start
+                continue
+            pieces.append(content[position:start])
+            pieces.append(" " * (end - start))
+            position = end
+        pieces.append(content[position:])
+        for start in stack:
+            pairs[start] = len(content) - 1
+        return pairs, "".join(pieces)
+
+    def brace_pairs(self, content):
+        """
+        Maps the offset of every code '{' to the offset of its matching '}'.
+        Unclosed braces map to the last offset of the content.
+        """
+        return self.scan(content)[0]
+
+    def iter_spans(self, content):
+        """Yields (name, start, end) for each function, with end exclusive."""
+        pairs, code = self.scan(content)
+        for match in self.function_pattern.finditer(code):
+            name = match.group(self.name_group)
+            if name in self.reserved_names:
+                continue
+            close = pairs.get(match.end() - 1)
+            if close is None:
+                continue
+            yield name, match.start(), close + 1
+
+    def extract_functions(self, content):
+        """
+        Extracts functions from the content: name, code, character offsets (end exclusive)
+        and 1-based start and end lines.
+        """
+        starts = None
+        functions = []
+        for name, start, end in self.iter_spans(content):
+            if starts is None:
+                starts = line_starts(content)
+            functions.append(
+                {
+                    "name": name,
+                    "code": content[start:end],
+                    "start": start,
+                    "end": end,
+                    "start_line": bisect.bisect_right(starts, start),
+                    "end_line": bisect.bisect_right(starts, end - 1),
+                }
+            )
+        return functions
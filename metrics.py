@@ -0,0 +1,164 @@
+import re
+import time
+import threading
+from contextlib import contextmanager
+
+# Upper bounds of the latency histograms, in seconds.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Upper bounds of the token count histograms.
+TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# Every metric created, in creation order, for render().
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base of the in-process metrics exposed at /metrics in the Prometheus text format.
+    Values are kept per combination of label values and are safe to update from any thread.
+    Under a multi-process server each process reports its own values.
+    """
+
+    kind = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.values = {}  # tuple of label values -> value
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.values.items())
+            for key, value in items:
+                lines.extend(self._samples(list(zip(self.label_names, key)), value))
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count; by convention its name ends in _total."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self, labels, value):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}"]
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self.values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the with block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self, labels, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["buckets"]):
+            cumulative += count
+            bucket_labels = labels + [("le", _format_value(bound))]
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {state['count']}")
+        return lines
+
+
+def render():
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of LLM tokens in text by counting words and punctuation marks,
+    since the inference API does not report token usage.
+    """
+    return len(re.findall(r"\w+|[^\w\s]", text or ""))
+
+
+PARSE_SECONDS = Histogram(
+    "bigoh_parse_seconds", "Time spent parsing one file.", ("language",)
+)
+STORE_SECONDS = Histogram(
+    "bigoh_store_seconds",
+    "Latency of storage backend operations.",
+    ("backend", "operation"),
+)
+LLM_SECONDS = Histogram(
+    "bigoh_llm_seconds",
+    "Latency of LLM calls; streamed calls are timed until the last token.",
+    ("mode", "status"),
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "bigoh_llm_prompt_tokens", "Estimated tokens per LLM prompt.", ("mode",), TOKEN_BUCKETS
+)
+LLM_RESPONSE_TOKENS = Histogram(
+    "bigoh_llm_response_tokens",
+    "Estimated tokens per LLM response.",
+    ("mode",),
+    TOKEN_BUCKETS,
+)
+LLM_RETRIES = Counter("bigoh_llm_retries_total", "LLM calls retried after an error.")
+CACHE_REQUESTS = Counter(
+    "bigoh_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result")
+)
+INGESTION_JOBS = Counter(
+    "bigoh_ingestion_jobs_total", "Finished background ingestion jobs.", ("status",)
+)
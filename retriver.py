@@ -1,126 +1,705 @@
+import io
 import logging
+import os
+import re
+import threading
 import time
-from neo4j import GraphDatabase
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from neo4j.exceptions import Neo4jError
 from huggingface_hub import InferenceClient
 from fpdf import FPDF
+from cache import DiskCache, MemoryCache, cache_key
+from sessions import SessionStore
+from storage import create_store
+from complexity import big_o
+from imports import dependency_cycles, dependency_layers
+from metrics import (
+    LLM_SECONDS,
+    LLM_PROMPT_TOKENS,
+    LLM_RESPONSE_TOKENS,
+    LLM_RETRIES,
+    estimate_tokens,
+)
 from config import (
-    NEO4J_URI,
-    NEO4J_USERNAME,
-    NEO4J_PASSWORD,
-    NEO4J_DATABASE,
     HF_TOKEN,
     HF_MODEL,
+    ANALYSIS_CACHE_DIR,
+    ANALYSIS_CACHE_MAX_BYTES,
+    ANALYSIS_MAX_PROMPT_CHARS,
+    ANALYSIS_CONCURRENCY,
+    REPORT_CACHE_MAX_BYTES,
+    REPORT_CACHE_MAX_ENTRIES,
+    REPORT_RENDER_WORKERS,
+    QA_TOP_K,
+    QA_SNIPPET_CHARS,
+    SESSION_TTL_SECONDS,
+    SESSION_MAX_PROJECTS,
+    SESSION_MAX_BYTES,
+    SESSION_MAX_HISTORY_CHARS,
 )
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the analysis prompt changes so cached analyses are not reused.
+ANALYSIS_PROMPT_VERSION = "1"
+CHUNK_PROMPT_VERSION = "1"
+
+DOCUMENTATION_INSTRUCTIONS = (
+    "Provide a detailed breakdown including:\n"
+    "- Code structure\n"
+    "- Potential issues and improvements\n"
+    "- Functionality and purpose of key components\n"
+    "- Detailed explanation of each function and module\n"
+    "- Security concerns, performance optimizations, and best practices\n"
+    "Provide the response in a well-structured documentation format."
+)
+
+ANALYSIS_FAILED = "⚠️ Failed to generate insights after multiple attempts."
+QUESTION_FAILED = "⚠️ Sorry, I couldn't process your question."
+
+
+def search_terms(question):
+    """Returns the distinct words of a question, which are searched as plain terms."""
+    words = re.findall(r"\w{2,}", question)
+    return list(dict.fromkeys(words))
+
+
+def function_code(record):
+    """
+    Fills in the code of a Function record that only stores its span (compact ingestion)
+    by slicing it out of the file content returned alongside it.
+    """
+    content = record.pop("content", None)
+    has_span = content is not None and record.get("start") is not None
+    if record.get("code") is None and has_span:
+        record["code"] = content[record["start"] : record["end"]]
+    record["code"] = record.get("code") or ""
+    return record
+
+
+def _report_version(project_name, analysis, history):
+    return cache_key(
+        "report",
+        project_name,
+        analysis or "",
+        *(part for exchange in history for part in exchange),
+    )
+
+
+def split_chunks(path, content, max_chars):
+    """Splits a file into (label, text) chunks of at most max_chars, breaking at line ends."""
+    if len(content) <= max_chars:
+        return [(path, content)]
+    pieces = []
+    current = []
+    size = 0
+    for line in content.splitlines(True):
+        if current and size + len(line) > max_chars:
+            pieces.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        pieces.append("".join(current))
+    return [
+        (f"{path} (part {i + 1}/{len(pieces)})", piece)
+        for i, piece in enumerate(pieces)
+    ]
+
 
 class CodeAnalyzer:
-    def __init__(self):
-        """Initialize Neo4j and Hugging Face client."""
-        self.driver = GraphDatabase.driver(
-            NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD)
-        )
+    def __init__(self, store=None):
+        """Initialize the storage backend (configured backend by default) and Hugging Face client."""
+        self.store = store if store is not None else create_store()
         self.llm_client = InferenceClient(model=HF_MODEL, token=HF_TOKEN)
-        self.conversation_history = ""  # Stores Q&A history
-        self.analysis = None  # Stores the analysis result
+        # Latest analysis and Q&A history per project
+        self.sessions = SessionStore(
+            SESSION_TTL_SECONDS,
+            SESSION_MAX_PROJECTS,
+            SESSION_MAX_BYTES,
+            SESSION_MAX_HISTORY_CHARS,
+        )
+        # Analyses keyed by a hash of the code, model and prompt version
+        self.analysis_cache = DiskCache(
+            ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_BYTES, name="analysis"
+        )
+        # Rendered PDF reports keyed by their version, and the renders in progress
+        self.report_cache = MemoryCache(
+            REPORT_CACHE_MAX_BYTES, REPORT_CACHE_MAX_ENTRIES, name="report"
+        )
+        self.report_executor = ThreadPoolExecutor(
+            max_workers=REPORT_RENDER_WORKERS, thread_name_prefix="report"
+        )
+        self.report_renders = {}  # version -> Future of its rendered bytes
+        self.report_lock = threading.Lock()
 
     def close(self):
-        """Closes the Neo4j connection."""
-        if self.driver:
-            self.driver.close()
-            logger.info("Closed Neo4j connection.")
+        """Closes the storage connection."""
+        if self.store:
+            self.store.close()
+            logger.info(f"Closed {self.store.name} connection.")
 
     def get_all_projects(self):
         """Retrieve all project names from the database."""
-        query = "MATCH (p:Project) RETURN p.name AS name"
-        projects = []
         try:
-            with self.driver.session(database=NEO4J_DATABASE) as session:
-                result = session.run(query)
-                projects = [record["name"] for record in result]
-            return projects
+            with self.store.timed("list_projects"):
+                return self.store.list_projects()
         except Exception as e:
-            logger.error(f"Error retrieving projects from Neo4j: {e}")
+            logger.error(f"Error retrieving projects from {self.store.name}: {e}")
             return []
 
     def retrieve_code(self, project_name):
-        """Retrieve all code files linked to a project from Neo4j."""
-        query = """
-        MATCH (p:Project {name: $project_name})-[:CONTAINS_FILE]->(f:File)
-        RETURN f.content AS content
-        """
+        """Retrieve all code files linked to a project from storage."""
         try:
-            with self.driver.session(database=NEO4J_DATABASE) as session:
-                result = session.run(query, project_name=project_name)
-                code_snippets = [record["content"] for record in result]
+            with self.store.timed("project_files"):
+                files = self.store.project_files(project_name)
+            code_snippets = [content for _, content in files]
             return "\n\n".join(code_snippets) if code_snippets else None
         except Exception as e:
-            logger.error(f"Error retrieving code from Neo4j: {e}")
+            logger.error(f"Error retrieving code from {self.store.name}: {e}")
             return None
 
-    def perform_analysis(self, content):
-        """Generates full documentation for the code using LLM."""
-        prompt = (
-            f"Analyze the following code and provide insights:\n\n{content}\n\n"
-            "Provide a detailed breakdown including:\n"
-            "- Code structure\n"
-            "- Potential issues and improvements\n"
-            "- Functionality and purpose of key components\n"
-            "- Detailed explanation of each function and module\n"
-            "- Security concerns, performance optimizations, and best practices\n"
-            "Provide the response in a well-structured documentation format."
-        )
-        retries = 3
-        delay = 10
+    def retrieve_files(self, project_name):
+        """Retrieve the path and content of every file linked to a project from storage."""
+        try:
+            with self.store.timed("project_files"):
+                return self.store.project_files(project_name)
+        except Exception as e:
+            logger.error(f"Error retrieving files from {self.store.name}: {e}")
+            return []
+
+    def hotspots(self, project_name, metric, limit):
+        """
+        Returns the project's functions ranked by a static metric computed at ingestion,
+        each with a Big-O hint from its loop nesting, or None if the project does not exist.
+        No code is sent to the LLM.
+        """
+        try:
+            with self.store.timed("hotspots"):
+                if not self.store.project_exists(project_name):
+                    return None
+                functions = self.store.hotspots(project_name, metric, limit)
+        except Exception as e:
+            logger.error(f"Error retrieving hotspots from {self.store.name}: {e}")
+            return []
+        for function in functions:
+            function["big_o"] = big_o(function["loop_depth"])
+        return functions
+
+    def reachable(self, project_name, function_name, direction, depth, limit, file=None):
+        """
+        Walks the Function CALLS graph breadth-first from the functions whose name or
+        qualified name is function_name (only those in file, if given): towards the
+        functions they call (direction "callees") or the functions calling them ("callers").
+        Each level is a single query over the whole frontier, so the cost follows the
+        number of functions reached.
+        Returns the start functions and up to limit reached functions with their distance,
+        or None if no such function exists in the project.
+        """
+        with self.store.timed("find_functions"):
+            roots = self.store.find_functions(project_name, function_name)
+        if file:
+            roots = [root for root in roots if root["file"] == file]
+        if not roots:
+            return None
+        seen = {(root["file"], root["qualname"]) for root in roots}
+        frontier = roots
+        reached = []
+        truncated = False
+        for distance in range(1, depth + 1):
+            if not frontier or truncated:
+                break
+            with self.store.timed("call_neighbors"):
+                neighbors = self.store.call_neighbors(frontier, direction)
+            frontier = []
+            for function in neighbors:
+                key = (function["file"], function["qualname"])
+                if key in seen:
+                    continue
+                if len(reached) >= limit:
+                    truncated = True
+                    break
+                seen.add(key)
+                frontier.append(function)
+                reached.append({**function, "depth": distance})
+        return {"roots": roots, "functions": reached, "truncated": truncated}
+
+    def import_graph(self, project_name, by="file"):
+        """
+        Returns the project's module dependencies as (importer, imported) pairs, between
+        files or, with by="directory", between their directories (imports within a
+        directory are dropped). Returns None if the project does not exist.
+        """
+        with self.store.timed("import_edges"):
+            if not self.store.project_exists(project_name):
+                return None
+            rows = self.store.import_edges(project_name)
+        edges = {(row["from"], row["to"]) for row in rows}
+        if by == "directory":
+            edges = {
+                (os.path.dirname(a), os.path.dirname(b))
+                for a, b in edges
+                if os.path.dirname(a) != os.path.dirname(b)
+            }
+        return sorted(edges)
+
+    def import_cycles(self, project_name, by="file"):
+        """Returns the groups of files (or directories) that import each other, largest first."""
+        edges = self.import_graph(project_name, by)
+        return None if edges is None else dependency_cycles(edges)
+
+    def import_layers(self, project_name, by="file"):
+        """
+        Returns the project's files (or directories) in dependency layers: layer 0 imports
+        nothing from the project, every other layer only imports from the layers below it
+        or its own import cycles. Files without project imports either way are left out.
+        """
+        edges = self.import_graph(project_name, by)
+        return None if edges is None else dependency_layers(edges)
+
+    def analysis_version(self, project_name):
+        """
+        Returns (etag, last_modified) identifying a project's analysis, or None if the project
+        has no files or its version cannot be read. The analysis only changes with the
+        project's files, the model or the prompt version.
+        """
+        try:
+            with self.store.timed("project_version"):
+                version = self.store.project_version(project_name)
+        except Exception as e:
+            logger.error(f"Error reading project version from {self.store.name}: {e}")
+            return None
+        if version is None:
+            return None
+        digest, updated_at = version
+        etag = cache_key(HF_MODEL, ANALYSIS_PROMPT_VERSION, digest)
+        return etag, datetime.fromtimestamp(updated_at, timezone.utc)
+
+    def analyze_project(self, project_name):
+        """
+        Generates the documentation for a project, or returns None if it has no files.
+        Projects that fit in one prompt are analyzed directly; larger ones are summarized
+        file by file and the summaries merged (see perform_chunked_analysis).
+        """
+        files = self.retrieve_files(project_name)
+        if not files:
+            return None
+        key, make_prompt = self._plan_project_analysis(files)
+        analysis = self._run_analysis(key, make_prompt)
+        self._remember_analysis(project_name, analysis)
+        return analysis
+
+    def stream_project_analysis(self, project_name):
+        """
+        Streaming variant of analyze_project: returns a generator of text pieces,
+        or None if the project has no files. A cached analysis is yielded in one piece;
+        otherwise tokens are yielded as the LLM produces them and the complete text is
+        cached once generation finishes. If the LLM fails mid-stream the generator raises
+        and the partial text is not cached.
+        """
+        files = self.retrieve_files(project_name)
+        if not files:
+            return None
+        key, make_prompt = self._plan_project_analysis(files)
+
+        def tokens():
+            analysis = self.analysis_cache.get(key)
+            if analysis is not None:
+                logger.info("Serving analysis from cache")
+                yield analysis
+            else:
+                parts = []
+                for token in self._generate_stream(make_prompt(), 10000):
+                    parts.append(token)
+                    yield token
+                analysis = self._finish_analysis(key, "".join(parts).strip() or None)
+                if not parts:
+                    yield analysis
+            self._remember_analysis(project_name, analysis)
+
+        return tokens()
+
+    def _plan_project_analysis(self, files):
+        """
+        Returns the cache key of a project's analysis and a function building its prompt.
+        The prompt is only built on a cache miss, since for large projects that runs the
+        per-file summaries.
+        """
+        if sum(len(content or "") for _, content in files) <= ANALYSIS_MAX_PROMPT_CHARS:
+            content = "\n\n".join(c for _, c in files)
+            key = cache_key(HF_MODEL, ANALYSIS_PROMPT_VERSION, content)
+            return key, lambda: self._analysis_prompt(content)
+        return self._plan_chunked_analysis(files)
+
+    def _remember_analysis(self, project_name, analysis):
+        """
+        Keeps the latest analysis of a project in its session for the report, and on disk
+        as context for answering questions.
+        """
+        self.sessions.set_analysis(project_name, analysis)
+        if analysis and analysis != ANALYSIS_FAILED:
+            self.analysis_cache.set(cache_key("project-summary", project_name), analysis)
+
+    def _generate(self, prompt, max_new_tokens, retries=3, delay=10):
+        """
+        Calls the LLM, retrying with exponential backoff.
+        Returns the stripped text, or None if every attempt failed.
+        """
         for attempt in range(retries):
             try:
                 logger.info(f"Attempt {attempt + 1} to generate insights...")
-                response = self.llm_client.text_generation(prompt, max_new_tokens=10000)
-                insights = (
-                    response
-                    if isinstance(response, str)
-                    else response.get("generated_text", "")
-                )
-                self.analysis = insights.strip()  # Store analysis result separately
-                return self.analysis
+                return self._complete(prompt, max_new_tokens).strip()
             except Exception as e:
                 logger.error(f"Error generating insights: {e}")
                 if attempt < retries - 1:
+                    LLM_RETRIES.inc()
                     logger.info(f"Retrying in {delay} seconds...")
                     time.sleep(delay)
                     delay *= 2
-                else:
-                    self.analysis = (
-                        "⚠️ Failed to generate insights after multiple attempts."
-                    )
-                    return self.analysis
+        return None
+
+    def _complete(self, prompt, max_new_tokens):
+        """Calls the LLM once and returns its text, recording latency and token counts."""
+        LLM_PROMPT_TOKENS.observe(estimate_tokens(prompt), mode="complete")
+        start = time.perf_counter()
+        try:
+            response = self.llm_client.text_generation(
+                prompt, max_new_tokens=max_new_tokens
+            )
+        except Exception:
+            LLM_SECONDS.observe(
+                time.perf_counter() - start, mode="complete", status="error"
+            )
+            raise
+        LLM_SECONDS.observe(time.perf_counter() - start, mode="complete", status="ok")
+        text = (
+            response if isinstance(response, str) else response.get("generated_text", "")
+        )
+        LLM_RESPONSE_TOKENS.observe(estimate_tokens(text), mode="complete")
+        return text
 
-    def answer_question(self, documentation, question):
-        """Generates an answer for a given question based on the provided documentation."""
+    def _generate_stream(self, prompt, max_new_tokens):
+        """
+        Yields the LLM's tokens as they arrive. Errors are logged and re-raised rather
+        than retried, since tokens already sent to the client cannot be taken back, and
+        callers must not keep the partial text as a complete response.
+        """
+        LLM_PROMPT_TOKENS.observe(estimate_tokens(prompt), mode="stream")
+        start = time.perf_counter()
+        parts = []
+        status = "ok"
+        try:
+            for token in self.llm_client.text_generation(
+                prompt, max_new_tokens=max_new_tokens, stream=True
+            ):
+                text = token if isinstance(token, str) else token.token.text
+                parts.append(text)
+                yield text
+        except Exception as e:
+            status = "error"
+            logger.error(f"Error streaming from LLM: {e}")
+            raise
+        finally:
+            LLM_SECONDS.observe(time.perf_counter() - start, mode="stream", status=status)
+            LLM_RESPONSE_TOKENS.observe(estimate_tokens("".join(parts)), mode="stream")
+
+    def _run_analysis(self, key, make_prompt):
+        """Returns the cached analysis for the key, or generates and caches it."""
+        cached = self.analysis_cache.get(key)
+        if cached is not None:
+            logger.info("Serving analysis from cache")
+            return cached
+        return self._finish_analysis(key, self._generate(make_prompt(), 10000))
+
+    def _finish_analysis(self, key, insights):
+        """Stores a generated analysis (None when generation failed) and returns it."""
+        if insights is None:
+            return ANALYSIS_FAILED
+        self.analysis_cache.set(key, insights)
+        return insights
+
+    def perform_analysis(self, content):
+        """
+        Generates full documentation for the code using LLM.
+        Results are cached by the code's hash, so unchanged projects are answered from disk.
+        """
+        key = cache_key(HF_MODEL, ANALYSIS_PROMPT_VERSION, content)
+        return self._run_analysis(key, lambda: self._analysis_prompt(content))
+
+    def _analysis_prompt(self, content):
+        return (
+            f"Analyze the following code and provide insights:\n\n{content}\n\n"
+            + DOCUMENTATION_INSTRUCTIONS
+        )
+
+    def perform_chunked_analysis(self, files):
+        """
+        Generates documentation for projects too large for a single prompt (map-reduce):
+        - Map: each file, split into chunks of ANALYSIS_MAX_PROMPT_CHARS, is summarized
+          with up to ANALYSIS_CONCURRENCY concurrent LLM calls.
+        - Reduce: the summaries are merged in groups until they fit one prompt,
+          then turned into the final documentation.
+        Chunk summaries are cached by content, so a change to one file only re-summarizes it.
+        """
+        return self._run_analysis(*self._plan_chunked_analysis(files))
+
+    def _plan_chunked_analysis(self, files):
+        """Returns the cache key of a chunked analysis and a function building its prompt."""
+        chunks = []
+        for path, content in files:
+            chunks.extend(split_chunks(path, content or "", ANALYSIS_MAX_PROMPT_CHARS))
+        keys = [
+            cache_key(HF_MODEL, CHUNK_PROMPT_VERSION, label, text)
+            for label, text in chunks
+        ]
+        final_key = cache_key(HF_MODEL, ANALYSIS_PROMPT_VERSION, *keys)
+        return final_key, lambda: self._summarized_prompt(chunks, keys)
+
+    def _summarized_prompt(self, chunks, keys):
+        """Summarizes every chunk and builds the final documentation prompt from them."""
+        logger.info(f"Summarizing {len(chunks)} chunks")
+        with ThreadPoolExecutor(max_workers=ANALYSIS_CONCURRENCY) as executor:
+            summaries = list(executor.map(self._summarize_chunk, chunks, keys))
+            summaries = self._merge_summaries(executor, summaries)
+        return (
+            "The following are summaries of every file in a code project:\n\n"
+            + "\n\n".join(summaries)
+            + "\n\nUsing them, analyze the project and provide insights.\n"
+            + DOCUMENTATION_INSTRUCTIONS
+        )
+
+    def _summarize_chunk(self, chunk, key):
+        """Summarizes one chunk of a file, using the cached summary when there is one."""
+        label, text = chunk
+        cached = self.analysis_cache.get(key)
+        if cached is not None:
+            return cached
+        prompt = (
+            f"Summarize the following source code from {label} "
+            "for a project documentation report:\n\n"
+            f"{text}\n\n"
+            "Describe its purpose, each function and class, and any potential issues, "
+            "security concerns or performance problems. Be concise."
+        )
+        summary = self._generate(prompt, max_new_tokens=1000)
+        if summary is None:
+            return f"### {label}\n(Summary unavailable)"
+        summary = f"### {label}\n{summary}"
+        self.analysis_cache.set(key, summary)
+        return summary
+
+    def _merge_summaries(self, executor, summaries, max_rounds=3):
+        """Merges groups of summaries with the LLM until they fit into a single prompt."""
+        for _ in range(max_rounds):
+            if sum(len(s) for s in summaries) <= ANALYSIS_MAX_PROMPT_CHARS:
+                break
+            groups, group, size = [], [], 0
+            for summary in summaries:
+                if group and size + len(summary) > ANALYSIS_MAX_PROMPT_CHARS:
+                    groups.append(group)
+                    group, size = [], 0
+                group.append(summary)
+                size += len(summary)
+            groups.append(group)
+            logger.info(f"Merging {len(summaries)} summaries into {len(groups)}")
+            summaries = list(executor.map(self._merge_group, groups))
+        return summaries
+
+    def _merge_group(self, group):
+        """Combines a group of file summaries into one shorter summary."""
+        if len(group) == 1:
+            return group[0]
+        prompt = (
+            "Combine the following file summaries from one code project into a single "
+            "concise summary that keeps every file, function and issue mentioned:\n\n"
+            + "\n\n".join(group)
+        )
+        merged = self._generate(prompt, max_new_tokens=2000)
+        return merged if merged is not None else "\n\n".join(group)
+
+    def answer_question(self, documentation, question, project_name=None):
+        """
+        Generates an answer for a given question based on the provided documentation.
+        The exchange is added to the project's history when a project name is given.
+        """
         prompt = (
             f"Based on the following code documentation:\n\n{documentation}\n\n"
             f"Answer the user's question: {question}"
         )
-        try:
-            response = self.llm_client.text_generation(prompt, max_new_tokens=1500)
-            answer = (
-                response
-                if isinstance(response, str)
-                else response.get("generated_text", "")
+        return self._answer(prompt, question, project_name)
+
+    def answer_project_question(self, project_name, question):
+        """
+        Answers a question about a project from the functions most relevant to it.
+        The top QA_TOP_K functions found by the full-text index, plus the cached project
+        summary when there is one, form a small prompt instead of the full documentation.
+        Returns None if the project does not exist.
+        """
+        prompt = self._question_prompt(project_name, question)
+        if prompt is None:
+            return None
+        return self._answer(prompt, question, project_name)
+
+    def stream_project_answer(self, project_name, question):
+        """
+        Streaming variant of answer_project_question: returns a generator of tokens,
+        or None if the project does not exist. The complete answer is added to the
+        conversation history once generation finishes; an answer cut short by an LLM
+        error raises instead and is not recorded.
+        """
+        prompt = self._question_prompt(project_name, question)
+        if prompt is None:
+            return None
+
+        def tokens():
+            parts = []
+            for token in self._generate_stream(prompt, 1500):
+                parts.append(token)
+                yield token
+            answer = "".join(parts).strip()
+            if not answer:
+                answer = QUESTION_FAILED
+                yield answer
+            self.sessions.add_exchange(project_name, question, answer)
+
+        return tokens()
+
+    def _question_prompt(self, project_name, question):
+        """Builds the retrieval prompt for a question, or returns None for an unknown project."""
+        if not self.project_exists(project_name):
+            return None
+        snippets = self.search_code(project_name, question)
+        summary = self.analysis_cache.get(cache_key("project-summary", project_name))
+        context = ""
+        if summary:
+            context += f"Project summary:\n{summary[:QA_SNIPPET_CHARS]}\n\n"
+        if snippets:
+            context += "Relevant code:\n\n" + "\n\n".join(
+                f"### {s['name']} ({s['file']})\n{s['code'][:QA_SNIPPET_CHARS]}"
+                for s in snippets
             )
+        return (
+            f"Based on the following excerpts of a code project:\n\n{context}\n\n"
+            f"Answer the user's question: {question}"
+        )
+
+    def project_exists(self, project_name):
+        """Checks whether a Project node with the given name exists."""
+        try:
+            with self.store.timed("project_exists"):
+                return self.store.project_exists(project_name)
+        except Exception as e:
+            logger.error(f"Error checking project in {self.store.name}: {e}")
+            return False
+
+    def search_code(self, project_name, question, top_k=QA_TOP_K):
+        """
+        Returns the top_k functions of the project most relevant to the question, as dicts
+        with name, file and code. Falls back to whole files when no function matches.
+        """
+        words = search_terms(question)
+        if not words:
+            return []
+        try:
+            for search in (self.store.search_functions, self.store.search_files):
+                with self.store.timed(search.__name__):
+                    records = search(project_name, words, top_k)
+                snippets = [function_code(record) for record in records]
+                if snippets:
+                    return snippets
+            return []
+        except Exception as e:
+            logger.error(f"Error searching code in {self.store.name}: {e}")
+            return []
+
+    def _answer(self, prompt, question, project_name=None):
+        """Sends a question prompt to the LLM and records the exchange in the project's history."""
+        try:
             # Remove extra leading/trailing whitespace
-            answer = answer.strip()
-            # Update conversation history with formatted Q&A
-            self.conversation_history += f"\nUser: {question}\nAI:\n{answer}\n"
+            answer = self._complete(prompt, 1500).strip()
+            # Update the project's conversation history
+            if project_name is not None:
+                self.sessions.add_exchange(project_name, question, answer)
             return answer
         except Exception as e:
             logger.error(f"Error responding to query: {e}")
-            return "⚠️ Sorry, I couldn't process your question."
+            return QUESTION_FAILED
+
+    def _report_content(self, project_name):
+        """
+        Returns the analysis and conversation history that go into a project's report.
+        Falls back to the analysis cached on disk when this process has no session for it.
+        """
+        session = self.sessions.get(project_name) or {"analysis": None, "history": []}
+        analysis = session["analysis"] or self.analysis_cache.get(
+            cache_key("project-summary", project_name)
+        )
+        return analysis, session["history"]
+
+    def report_version(self, project_name):
+        """Returns a hash identifying the report's content: its analysis and history."""
+        return _report_version(project_name, *self._report_content(project_name))
+
+    def generate_pdf(self, project_name, wait=True):
+        """
+        Returns (version, stream): the PDF report with the project's analysis and
+        conversation history as an in-memory stream, and the hash of that content.
+        Rendered reports are cached by version, so unchanged reports are served as the
+        same bytes. Concurrent requests for a report share one render. With wait=False,
+        a report that is not cached yet is rendered in the background and the stream is
+        None until it is ready. A render that failed, or whose report is too large for
+        the cache, stays in report_renders until a request picks it up: that request gets
+        its report or raises its error, and the one after renders again.
+        """
+        analysis, history = self._report_content(project_name)
+        version = _report_version(project_name, analysis, history)
+        data = self.report_cache.get(version)
+        if data is None:
+            with self.report_lock:
+                render = self.report_renders.get(version)
+                if render is None:
+                    render = self.report_executor.submit(
+                        self._render_report, version, project_name, analysis, history
+                    )
+                    self.report_renders[version] = render
+            if not wait and not render.done():
+                return version, None
+            try:
+                data = render.result()
+            finally:
+                with self.report_lock:
+                    if self.report_renders.get(version) is render:
+                        del self.report_renders[version]
+        return version, io.BytesIO(data)
 
-    def generate_pdf(self, project_name):
-        """Generates a PDF file with the analysis and conversation history."""
+    def _render_report(self, version, project_name, analysis, history):
+        """
+        Renders a report and caches it; runs on the report executor. Only a render whose
+        report was cached removes itself from report_renders; the others are left for
+        generate_pdf to hand out.
+        """
+        try:
+            start = time.perf_counter()
+            data = self.render_pdf(project_name, analysis, history)
+            cached = self.report_cache.set(version, data)
+        except Exception as e:
+            logger.error(f"Error rendering report for {project_name}: {e}")
+            raise
+        if cached:
+            with self.report_lock:
+                self.report_renders.pop(version, None)
+        logger.info(
+            f"Rendered report for {project_name} ({len(data)} bytes) "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        return data
+
+    def render_pdf(self, project_name, analysis, history):
+        """Renders the report PDF for an analysis and Q&A history and returns its bytes."""
+        conversation_history = "".join(
+            f"\nUser: {question}\nAI:\n{answer}\n" for question, answer in history
+        )
         pdf = FPDF()
         pdf.add_page()
         pdf.set_auto_page_break(auto=True, margin=15)
@@ -134,8 +713,8 @@ class CodeAnalyzer:
         # Analysis Section
         pdf.set_font("Helvetica", "", 12)
         pdf.set_text_color(0, 0, 0)  # Set text color to black
-        if self.analysis:
-            pdf.multi_cell(0, 10, self.analysis)
+        if analysis:
+            pdf.multi_cell(0, 10, analysis)
             pdf.ln(10)
 
         # Conversation History Section
@@ -145,7 +724,7 @@ class CodeAnalyzer:
         pdf.ln(5)
         pdf.set_font("Helvetica", "", 12)
         pdf.set_text_color(0, 0, 0)  # Set text color to black
-        pdf.multi_cell(0, 10, self.conversation_history)
+        pdf.multi_cell(0, 10, conversation_history)
         pdf.ln(10)
 
         # Footer
@@ -154,6 +733,8 @@ class CodeAnalyzer:
         pdf.set_text_color(128, 128, 128)  # Set footer text color to gray
         pdf.cell(0, 10, "Developed by BigOh!", 0, 0, "C")
 
-        output_filename = f"{project_name}_analysis_report.pdf"
-        pdf.output(output_filename)
-        return output_filename
+        data = pdf.output(dest="S")
+        if isinstance(data, str):
+            # PyFPDF returns the document as a latin-1 string, fpdf2 as bytes
+            data = data.encode("latin-1")
+        return bytes(data)
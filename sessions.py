@@ -0,0 +1,104 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Per-project store for the latest analysis and the Q&A history.
+
+    Entries expire ttl seconds after their last use and are evicted least recently
+    used first once there are more than max_projects of them or they hold more than
+    max_bytes of text. Each project's history keeps only its most recent exchanges
+    within max_history_chars. All methods are thread-safe. The store lives in process
+    memory, so under a multi-worker server every worker keeps its own sessions.
+    """
+
+    def __init__(self, ttl, max_projects, max_bytes, max_history_chars):
+        self.ttl = ttl
+        self.max_projects = max_projects
+        self.max_bytes = max_bytes
+        self.max_history_chars = max_history_chars
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # project -> session, least recently used first
+        self.total_bytes = 0
+
+    def get(self, project_name):
+        """Returns a copy of the project's session ({"analysis", "history"}), or None."""
+        with self.lock:
+            self._expire()
+            session = self.sessions.get(project_name)
+            if session is None:
+                return None
+            self._touch(project_name, session)
+            return {"analysis": session["analysis"], "history": list(session["history"])}
+
+    def set_analysis(self, project_name, analysis):
+        """Stores the latest analysis of the project."""
+        with self.lock:
+            session = self._session(project_name)
+            self._resize(session, analysis=analysis)
+            self._evict(project_name)
+
+    def add_exchange(self, project_name, question, answer):
+        """Appends a question and its answer to the project's history."""
+        with self.lock:
+            session = self._session(project_name)
+            history = session["history"] + [(question, answer)]
+            # Drop the oldest exchanges beyond the per-project history limit
+            while len(history) > 1 and _history_size(history) > self.max_history_chars:
+                history.pop(0)
+            self._resize(session, history=history)
+            self._evict(project_name)
+
+    def _session(self, project_name):
+        """Returns the project's session, creating it if needed. Caller holds the lock."""
+        self._expire()
+        session = self.sessions.get(project_name)
+        if session is None:
+            session = {"analysis": None, "history": [], "size": 0, "used": 0.0}
+            self.sessions[project_name] = session
+        self._touch(project_name, session)
+        return session
+
+    def _touch(self, project_name, session):
+        session["used"] = time.monotonic()
+        self.sessions.move_to_end(project_name)
+
+    def _resize(self, session, **fields):
+        """Updates session fields and the size accounting. Caller holds the lock."""
+        session.update(fields)
+        size = len(session["analysis"] or "") + _history_size(session["history"])
+        self.total_bytes += size - session["size"]
+        session["size"] = size
+
+    def _expire(self):
+        """Removes sessions unused for longer than the TTL. Caller holds the lock."""
+        deadline = time.monotonic() - self.ttl
+        while self.sessions:
+            project_name, session = next(iter(self.sessions.items()))
+            if session["used"] >= deadline:
+                break
+            self._remove(project_name)
+
+    def _evict(self, keep):
+        """Evicts least recently used sessions beyond the limits, except keep."""
+        while len(self.sessions) > 1 and (
+            len(self.sessions) > self.max_projects or self.total_bytes > self.max_bytes
+        ):
+            project_name = next(iter(self.sessions))
+            if project_name == keep:
+                break
+            self._remove(project_name)
+
+    def _remove(self, project_name):
+        session = self.sessions.pop(project_name)
+        self.total_bytes -= session["size"]
+        logger.debug(f"Evicted session for project {project_name}")
+
+
+def _history_size(history):
+    return sum(len(question) + len(answer) for question, answer in history)
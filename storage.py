@@ -0,0 +1,1350 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from neo4j import GraphDatabase, RoutingControl
+from blobs import BLOB_CODEC, decompress_content
+from complexity import METRICS, HOTSPOT_METRICS
+from metrics import STORE_SECONDS
+from config import (
+    NEO4J_URI,
+    NEO4J_USERNAME,
+    NEO4J_PASSWORD,
+    NEO4J_DATABASE,
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_ACQUISITION_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME,
+    NEO4J_INDEX_WAIT_TIMEOUT,
+    STORAGE_BACKEND,
+    SQLITE_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GraphStore(ABC):
+    """
+    Storage operations behind KnowledgeGraphImporter and CodeAnalyzer.
+
+    The graph holds projects, files, functions, packages, content blobs, CALLS edges
+    both between files and between functions, and IMPORTS edges between files. Rows are
+    plain dicts using the property names of the Neo4j nodes: files carry path, filename,
+    content, language, content_hash, function_calls and imports; functions carry file,
+    name, qualname, kind, code, start, end, start_line, end_line, calls (the names they
+    call) and the static metrics listed in complexity.METRICS.
+    Functions are identified by their file and qualname, the dotted path of the classes
+    and functions enclosing them (just the name in languages without nesting), so
+    methods of different classes with the same name stay apart.
+    Methods raise on failure; callers decide how to log and recover.
+    """
+
+    name = "storage"
+
+    def timed(self, operation):
+        """Context manager recording the latency of an operation in the storage metrics."""
+        return STORE_SECONDS.time(backend=self.name, operation=operation)
+
+    @abstractmethod
+    def close(self):
+        """Releases the connection to the backend."""
+
+    @abstractmethod
+    def verify_connectivity(self):
+        """Raises if the backend cannot be reached."""
+
+    @abstractmethod
+    def create_schema(self):
+        """
+        Creates the constraints and indexes ingestion and search rely on, and returns once
+        they are online. Safe to run repeatedly.
+        """
+
+    # --- Ingestion ---
+
+    @abstractmethod
+    def create_project(self, project_name):
+        """Creates the project if it does not exist."""
+
+    @abstractmethod
+    def load_files(self, project_name=None):
+        """
+        Returns the stored files of the project (all files without a project) as dicts with
+        path, filename, language, content_hash, function_calls, imports and functions, a
+        list of {"name", "qualname", "calls"} dicts.
+        """
+
+    @abstractmethod
+    def write_file(self, row, project_name=None):
+        """Creates or updates a file and adds it to the project if that exists."""
+
+    @abstractmethod
+    def write_function(self, row):
+        """Creates or updates a function of an existing file."""
+
+    @abstractmethod
+    def write_package(self, file_path, package_name):
+        """Records that the file uses the package."""
+
+    @abstractmethod
+    def remove_stale(self, rows):
+        """
+        Deletes the functions and package uses of re-imported files that are no longer in
+        their content. Rows carry the path and the file's current functions and packages.
+        """
+
+    @abstractmethod
+    def write_batch(self, rows, project_name=None):
+        """
+        Writes buffered "files", "functions", "packages", "stale", "new_blobs" and "blobs"
+        rows in a single transaction.
+        """
+
+    @abstractmethod
+    def existing_blobs(self, hashes):
+        """Returns the subset of the given content hashes that are already stored."""
+
+    @abstractmethod
+    def write_blobs(self, rows):
+        """Stores compressed contents (hash, data, size) that are not stored yet."""
+
+    @abstractmethod
+    def link_blobs(self, rows):
+        """Points each file (path) at the blob of its current content (hash)."""
+
+    @abstractmethod
+    def write_call_edges(self, rows):
+        """Creates CALLS edges between files; rows carry "from", "to" and "function"."""
+
+    @abstractmethod
+    def delete_call_edges(self, rows):
+        """
+        Deletes the outgoing CALLS edges of each file (path) and its incoming edges for the
+        function names it no longer defines (removed).
+        """
+
+    @abstractmethod
+    def write_function_calls(self, rows):
+        """
+        Creates CALLS edges between functions; rows carry the caller's file and qualname
+        and the callee's callee_file and callee_qualname.
+        """
+
+    @abstractmethod
+    def delete_function_calls(self, paths):
+        """Deletes the outgoing function CALLS edges of every function in the given files."""
+
+    @abstractmethod
+    def write_imports(self, rows):
+        """Creates IMPORTS edges between files; rows carry "from" and "to" paths."""
+
+    @abstractmethod
+    def delete_imports(self, paths):
+        """Deletes the outgoing IMPORTS edges of the given files."""
+
+    @abstractmethod
+    def remove_package_uses(self, rows):
+        """Deletes the USES_PACKAGE edge from each file to the package called name."""
+
+    @abstractmethod
+    def update_fan_in(self, project_name=None):
+        """
+        Stores on each function of the project (every function without a project) the
+        number of functions calling it, as fan_in.
+        """
+
+    @abstractmethod
+    def execute_query(self, query, **kwargs):
+        """
+        Runs a query in the backend's own language (Cypher or SQL) with the keyword
+        arguments as named parameters, and returns its result.
+        """
+
+    @abstractmethod
+    def delete_all(self):
+        """Deletes everything in the graph."""
+
+    @abstractmethod
+    def delete_project(self, project_name):
+        """Deletes the project; its files stay in the graph."""
+
+    # --- Retrieval ---
+
+    @abstractmethod
+    def list_projects(self):
+        """Returns the names of all projects."""
+
+    @abstractmethod
+    def project_exists(self, project_name):
+        """Returns True if the project exists."""
+
+    @abstractmethod
+    def project_files(self, project_name):
+        """Returns (path, content) for every file of the project, ordered by path."""
+
+    @abstractmethod
+    def project_version(self, project_name):
+        """
+        Returns (digest, updated_at) for the project's files, or None if it has none.
+        The digest changes whenever a file is added or its content changes; updated_at is
+        the Unix time of the latest such change.
+        """
+
+    @abstractmethod
+    def hotspots(self, project_name, metric, limit):
+        """
+        Returns the limit functions of the project with the highest value of metric (one of
+        complexity.HOTSPOT_METRICS), as dicts with name, qualname, kind, file, start_line,
+        end_line and every metric. Classes and functions stored before metrics were computed
+        are left out.
+        """
+
+    @abstractmethod
+    def import_edges(self, project_name):
+        """Returns the IMPORTS edges between the project's files as "from" and "to" paths."""
+
+    @abstractmethod
+    def find_functions(self, project_name, name):
+        """
+        Returns the functions of the project whose name or qualname is name, as file, name
+        and qualname, by file.
+        """
+
+    @abstractmethod
+    def call_neighbors(self, functions, direction):
+        """
+        Returns the distinct functions (file, name and qualname) that the given functions
+        (file and qualname) call (direction "callees") or that call them ("callers"), one
+        hop away.
+        """
+
+    @abstractmethod
+    def search_functions(self, project_name, words, top_k):
+        """
+        Returns up to top_k functions of the project that best match the words, as dicts with
+        name, file, code, start and end. Functions stored without code (compact ingestion)
+        get it sliced from their file's content by the query; when that content is in a
+        compressed Blob they carry it as "content" instead, fetched once per Blob.
+        """
+
+    @abstractmethod
+    def search_files(self, project_name, words, top_k):
+        """Returns up to top_k files of the project that best match the words, as name, file and code."""
+
+
+# Constraints and indexes for the keys ingestion MERGEs and MATCHes on.
+SCHEMA_STATEMENTS = (
+    "CREATE CONSTRAINT project_name IF NOT EXISTS "
+    "FOR (p:Project) REQUIRE p.name IS UNIQUE",
+    "CREATE CONSTRAINT file_path IF NOT EXISTS FOR (f:File) REQUIRE f.path IS UNIQUE",
+    "CREATE CONSTRAINT package_name IF NOT EXISTS "
+    "FOR (p:Package) REQUIRE p.name IS UNIQUE",
+    # Function nodes stored before qualified names were keyed by their name
+    "MATCH (fn:Function) WHERE fn.qualname IS NULL "
+    "SET fn.qualname = fn.name, fn.kind = 'function'",
+    "DROP CONSTRAINT function_name_file IF EXISTS",
+    "CREATE CONSTRAINT function_qualname_file IF NOT EXISTS "
+    "FOR (fn:Function) REQUIRE (fn.qualname, fn.file) IS UNIQUE",
+    # Function lookups by file alone (stale-node cleanup) or by name (call graph
+    # queries) cannot use the composite index
+    "CREATE INDEX function_file IF NOT EXISTS FOR (fn:Function) ON (fn.file)",
+    "CREATE INDEX function_name IF NOT EXISTS FOR (fn:Function) ON (fn.name)",
+    "CREATE CONSTRAINT blob_hash IF NOT EXISTS FOR (b:Blob) REQUIRE b.hash IS UNIQUE",
+) + tuple(
+    # Range indexes that let the hotspot queries order by a metric
+    f"CREATE INDEX function_{metric} IF NOT EXISTS FOR (fn:Function) ON (fn.{metric})"
+    for metric in HOTSPOT_METRICS
+)
+
+# Full-text indexes used to find the code relevant to a question.
+SEARCH_INDEXES = (
+    "CREATE FULLTEXT INDEX function_search IF NOT EXISTS "
+    "FOR (n:Function) ON EACH [n.name, n.code]",
+    "CREATE FULLTEXT INDEX file_search IF NOT EXISTS FOR (n:File) ON EACH [n.content]",
+)
+
+FILE_QUERY = (
+    "UNWIND $rows AS row "
+    "MERGE (f:File {path: row.path}) "
+    # updated_at is set first so it compares against the previous content_hash
+    "SET f.updated_at = CASE WHEN f.content_hash = row.content_hash "
+    "        THEN coalesce(f.updated_at, timestamp()) ELSE timestamp() END, "
+    "    f.filename = row.filename, f.content = row.content, f.language = row.language, "
+    "    f.content_hash = row.content_hash, f.function_calls = row.function_calls, "
+    "    f.imports = row.imports "
+    "WITH f "
+    "OPTIONAL MATCH (p:Project {name: $project_name}) "
+    "FOREACH (ignoreMe IN CASE WHEN p IS NULL THEN [] ELSE [1] END | "
+    "   MERGE (p)-[:CONTAINS_FILE]->(f) )"
+)
+FUNCTION_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (f:File {path: row.file}) "
+    "MERGE (fn:Function {qualname: row.qualname, file: row.file}) "
+    "SET fn.name = row.name, fn.kind = row.kind, "
+    "    fn.code = row.code, fn.start = row.start, fn.end = row.end, "
+    "    fn.start_line = row.start_line, fn.end_line = row.end_line, fn.calls = row.calls, "
+    + ", ".join(f"fn.{metric} = row.{metric}" for metric in METRICS)
+    + " MERGE (f)-[:CONTAINS_FUNCTION]->(fn)"
+)
+PACKAGE_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (f:File {path: row.file}) "
+    "MERGE (p:Package {name: row.name}) "
+    "MERGE (f)-[:USES_PACKAGE]->(p)"
+)
+
+# Deletes what a re-imported file no longer contains; rows carry the qualnames of the
+# file's current functions and the names of its current packages.
+STALE_FUNCTIONS_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (fn:Function {file: row.path}) "
+    "WHERE NOT fn.qualname IN row.functions "
+    "DETACH DELETE fn"
+)
+STALE_PACKAGES_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (:File {path: row.path})-[r:USES_PACKAGE]->(p:Package) "
+    "WHERE NOT p.name IN row.packages "
+    "DELETE r"
+)
+
+# Blob nodes hold compressed file contents keyed by their SHA-256, shared by all files
+# and projects with the same content.
+BLOB_QUERY = (
+    "UNWIND $rows AS row "
+    "MERGE (b:Blob {hash: row.hash}) "
+    "ON CREATE SET b.data = row.data, b.size = row.size, b.codec = $codec"
+)
+
+# Points each file at the Blob of its current content, dropping the link to the old one.
+BLOB_LINK_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (f:File {path: row.path}), (b:Blob {hash: row.hash}) "
+    "OPTIONAL MATCH (f)-[old:HAS_CONTENT]->(o:Blob) WHERE o.hash <> row.hash "
+    "DELETE old "
+    "WITH DISTINCT f, b "
+    "MERGE (f)-[:HAS_CONTENT]->(b)"
+)
+
+CALLS_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (f1:File {path: row.from}), (f2:File {path: row.to}) "
+    "MERGE (f1)-[:CALLS {function: row.function}]->(f2)"
+)
+# Function-level CALLS edges, resolved by KnowledgeGraphImporter from each function's calls.
+FUNCTION_CALLS_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (caller:Function {qualname: row.qualname, file: row.file}), "
+    "      (callee:Function {qualname: row.callee_qualname, file: row.callee_file}) "
+    "MERGE (caller)-[:CALLS]->(callee)"
+)
+STALE_FUNCTION_CALLS_QUERY = (
+    "UNWIND $paths AS path "
+    "MATCH (:Function {file: path})-[r:CALLS]->(:Function) "
+    "DELETE r"
+)
+# One hop of a reachability search, from a frontier of functions
+CALL_NEIGHBORS_QUERIES = {
+    "callees": (
+        "UNWIND $rows AS row "
+        "MATCH (:Function {qualname: row.qualname, file: row.file})-[:CALLS]->(fn:Function) "
+        "RETURN DISTINCT fn.file AS file, fn.name AS name, fn.qualname AS qualname"
+    ),
+    "callers": (
+        "UNWIND $rows AS row "
+        "MATCH (:Function {qualname: row.qualname, file: row.file})<-[:CALLS]-(fn:Function) "
+        "RETURN DISTINCT fn.file AS file, fn.name AS name, fn.qualname AS qualname"
+    ),
+}
+FAN_IN_SET = "SET fn.fan_in = size([(caller:Function)-[:CALLS]->(fn) | caller])"
+
+# Module dependencies between files, resolved by KnowledgeGraphImporter from File.imports.
+IMPORTS_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (a:File {path: row.from}), (b:File {path: row.to}) "
+    "MERGE (a)-[:IMPORTS]->(b)"
+)
+STALE_IMPORTS_QUERY = (
+    "UNWIND $paths AS path "
+    "MATCH (:File {path: path})-[r:IMPORTS]->(:File) "
+    "DELETE r"
+)
+LOCAL_PACKAGES_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (:File {path: row.file})-[r:USES_PACKAGE]->(:Package {name: row.name}) "
+    "DELETE r"
+)
+
+STALE_CALLS_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (f:File {path: row.path}) "
+    "OPTIONAL MATCH (f)-[out:CALLS]->(:File) "
+    "DELETE out "
+    "WITH DISTINCT f, row "
+    "OPTIONAL MATCH (:File)-[inc:CALLS]->(f) "
+    "WHERE inc.function IN row.removed "
+    "DELETE inc"
+)
+
+
+class Neo4jStore(GraphStore):
+    """
+    Stores the knowledge graph in Neo4j.
+
+    One store, and so one driver and connection pool, is meant to be shared by every
+    importer and analyzer in the process. Read-only queries are routed to followers
+    (RoutingControl.READ) and writes to the leader; all queries share the driver's
+    bookmark manager, so a read always sees the writes made before it.
+    """
+
+    name = "Neo4j"
+
+    def __init__(
+        self,
+        uri,
+        username,
+        password,
+        database,
+        max_pool_size=NEO4J_MAX_POOL_SIZE,
+        acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+        index_wait_timeout=NEO4J_INDEX_WAIT_TIMEOUT,
+    ):
+        self.database = database
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(username, password),
+            max_connection_pool_size=max_pool_size,
+            connection_acquisition_timeout=acquisition_timeout,
+            max_connection_lifetime=max_connection_lifetime,
+        )
+        self.index_wait_timeout = index_wait_timeout
+
+    def _run(self, query, **params):
+        records, _, _ = self.driver.execute_query(
+            query, **params, database_=self.database, routing_=RoutingControl.WRITE
+        )
+        return records
+
+    def _read(self, query, **params):
+        records, _, _ = self.driver.execute_query(
+            query, **params, database_=self.database, routing_=RoutingControl.READ
+        )
+        return records
+
+    def close(self):
+        self.driver.close()
+
+    def verify_connectivity(self):
+        self.driver.verify_connectivity()
+
+    def create_schema(self):
+        # A statement that fails (e.g. because existing data holds duplicates) is logged
+        # and the others are still applied.
+        for statement in SCHEMA_STATEMENTS + SEARCH_INDEXES:
+            try:
+                self._run(statement)
+            except Exception as e:
+                logger.error(f"Error applying schema statement '{statement}': {e}")
+        # New indexes populate in the background; searches before they are online fail
+        try:
+            self._run("CALL db.awaitIndexes($timeout)", timeout=self.index_wait_timeout)
+        except Exception as e:
+            logger.error(f"Error waiting for indexes to come online: {e}")
+
+    def create_project(self, project_name):
+        self._run("MERGE (p:Project {name: $project_name})", project_name=project_name)
+
+    def load_files(self, project_name=None):
+        if project_name:
+            match = "MATCH (:Project {name: $project_name})-[:CONTAINS_FILE]->(f:File) "
+        else:
+            match = "MATCH (f:File) "
+        query = (
+            match + "OPTIONAL MATCH (f)-[:CONTAINS_FUNCTION]->(fn:Function) "
+            "RETURN f.path AS path, f.filename AS filename, f.language AS language, "
+            "f.content_hash AS content_hash, f.function_calls AS function_calls, "
+            "f.imports AS imports, collect(CASE WHEN fn IS NOT NULL "
+            "    THEN {name: fn.name, qualname: fn.qualname, calls: coalesce(fn.calls, [])} "
+            "    END) AS functions"
+        )
+        return [record.data() for record in self._read(query, project_name=project_name)]
+
+    def write_file(self, row, project_name=None):
+        self._run(FILE_QUERY, rows=[row], project_name=project_name)
+
+    def write_function(self, row):
+        self._run(FUNCTION_QUERY, rows=[row])
+
+    def write_package(self, file_path, package_name):
+        self._run(PACKAGE_QUERY, rows=[{"file": file_path, "name": package_name}])
+
+    def remove_stale(self, rows):
+        self._run(STALE_FUNCTIONS_QUERY, rows=rows)
+        self._run(STALE_PACKAGES_QUERY, rows=rows)
+
+    def write_batch(self, rows, project_name=None):
+        with self.driver.session(
+            database=self.database,
+            bookmark_manager=self.driver.execute_query_bookmark_manager,
+        ) as session:
+            session.execute_write(self._write_batch, rows, project_name)
+
+    @staticmethod
+    def _write_batch(tx, rows, project_name):
+        """Transaction function that writes the rows of a batch with UNWIND queries."""
+        tx.run(FILE_QUERY, rows=rows["files"], project_name=project_name).consume()
+        if rows["functions"]:
+            tx.run(FUNCTION_QUERY, rows=rows["functions"]).consume()
+        if rows["packages"]:
+            tx.run(PACKAGE_QUERY, rows=rows["packages"]).consume()
+        if rows["stale"]:
+            tx.run(STALE_FUNCTIONS_QUERY, rows=rows["stale"]).consume()
+            tx.run(STALE_PACKAGES_QUERY, rows=rows["stale"]).consume()
+        if rows["new_blobs"]:
+            tx.run(BLOB_QUERY, rows=rows["new_blobs"], codec=BLOB_CODEC).consume()
+        if rows["blobs"]:
+            tx.run(BLOB_LINK_QUERY, rows=rows["blobs"]).consume()
+
+    def existing_blobs(self, hashes):
+        if not hashes:
+            return set()
+        records = self._read(
+            "MATCH (b:Blob) WHERE b.hash IN $hashes RETURN b.hash AS hash", hashes=hashes
+        )
+        return {record["hash"] for record in records}
+
+    def write_blobs(self, rows):
+        self._run(BLOB_QUERY, rows=rows, codec=BLOB_CODEC)
+
+    def link_blobs(self, rows):
+        self._run(BLOB_LINK_QUERY, rows=rows)
+
+    def write_call_edges(self, rows):
+        self._run(CALLS_QUERY, rows=rows)
+
+    def delete_call_edges(self, rows):
+        self._run(STALE_CALLS_QUERY, rows=rows)
+
+    def write_function_calls(self, rows):
+        self._run(FUNCTION_CALLS_QUERY, rows=rows)
+
+    def delete_function_calls(self, paths):
+        self._run(STALE_FUNCTION_CALLS_QUERY, paths=list(paths))
+
+    def write_imports(self, rows):
+        self._run(IMPORTS_QUERY, rows=rows)
+
+    def delete_imports(self, paths):
+        self._run(STALE_IMPORTS_QUERY, paths=list(paths))
+
+    def remove_package_uses(self, rows):
+        self._run(LOCAL_PACKAGES_QUERY, rows=rows)
+
+    def update_fan_in(self, project_name=None):
+        if project_name:
+            self._run(
+                "MATCH (:Project {name: $project_name})-[:CONTAINS_FILE]->(:File)"
+                "-[:CONTAINS_FUNCTION]->(fn:Function) " + FAN_IN_SET,
+                project_name=project_name,
+            )
+        else:
+            self._run("MATCH (fn:Function) " + FAN_IN_SET)
+
+    def execute_query(self, query, **kwargs):
+        return self.driver.execute_query(query, **kwargs)
+
+    def delete_all(self):
+        self._run("MATCH (n) DETACH DELETE n")
+
+    def delete_project(self, project_name):
+        self._run(
+            "MATCH (p:Project {name: $project_name}) DETACH DELETE p",
+            project_name=project_name,
+        )
+
+    def list_projects(self):
+        records = self._read("MATCH (p:Project) RETURN p.name AS name")
+        return [record["name"] for record in records]
+
+    def project_exists(self, project_name):
+        records = self._read(
+            "MATCH (p:Project {name: $project_name}) RETURN count(p) AS count",
+            project_name=project_name,
+        )
+        return bool(records and records[0]["count"])
+
+    def project_files(self, project_name):
+        query = """
+        MATCH (p:Project {name: $project_name})-[:CONTAINS_FILE]->(f:File)
+        OPTIONAL MATCH (f)-[:HAS_CONTENT]->(b:Blob)
+        RETURN f.path AS path, coalesce(f.content, b.data) AS content
+        ORDER BY f.path
+        """
+        return [
+            (record["path"], decompress_content(record["content"]))
+            for record in self._read(query, project_name=project_name)
+        ]
+
+    def project_version(self, project_name):
+        query = """
+        MATCH (:Project {name: $project_name})-[:CONTAINS_FILE]->(f:File)
+        RETURN f.path AS path, f.content_hash AS content_hash, f.updated_at AS updated_at
+        ORDER BY f.path
+        """
+        records = self._read(query, project_name=project_name)
+        if not records:
+            return None
+        updated_at = max(record["updated_at"] or 0 for record in records) / 1000
+        return _version_digest(records), updated_at
+
+    def hotspots(self, project_name, metric, limit):
+        _check_metric(metric)
+        query = f"""
+        MATCH (:Project {{name: $project_name}})-[:CONTAINS_FILE]->(:File)
+              -[:CONTAINS_FUNCTION]->(fn:Function)
+        WHERE fn.{metric} IS NOT NULL AND coalesce(fn.kind, '') <> 'class'
+        RETURN fn.name AS name, fn.qualname AS qualname, fn.kind AS kind, fn.file AS file,
+               fn.start_line AS start_line, fn.end_line AS end_line,
+               {", ".join(f"fn.{m} AS {m}" for m in HOTSPOT_METRICS)}
+        ORDER BY fn.{metric} DESC, fn.file, fn.qualname LIMIT $limit
+        """
+        records = self._read(query, project_name=project_name, limit=limit)
+        return [record.data() for record in records]
+
+    def import_edges(self, project_name):
+        query = """
+        MATCH (:Project {name: $project_name})-[:CONTAINS_FILE]->(a:File)
+              -[:IMPORTS]->(b:File)
+        RETURN a.path AS from, b.path AS to
+        """
+        return [record.data() for record in self._read(query, project_name=project_name)]
+
+    def find_functions(self, project_name, name):
+        query = """
+        MATCH (:Project {name: $project_name})-[:CONTAINS_FILE]->(:File)
+              -[:CONTAINS_FUNCTION]->(fn:Function)
+        WHERE fn.name = $name OR fn.qualname = $name
+        RETURN fn.file AS file, fn.name AS name, fn.qualname AS qualname
+        ORDER BY fn.file, fn.qualname
+        """
+        records = self._read(query, project_name=project_name, name=name)
+        return [record.data() for record in records]
+
+    def call_neighbors(self, functions, direction):
+        records = self._read(
+            CALL_NEIGHBORS_QUERIES[direction],
+            rows=[{"file": fn["file"], "qualname": fn["qualname"]} for fn in functions],
+        )
+        return [record.data() for record in records]
+
+    def search_functions(self, project_name, words, top_k):
+        # Blob data is compressed, so it cannot be sliced in Cypher
+        query = """
+        CALL db.index.fulltext.queryNodes('function_search', $terms) YIELD node, score
+        MATCH (:Project {name: $project_name})-[:CONTAINS_FILE]->(f:File)
+              -[:CONTAINS_FUNCTION]->(node)
+        OPTIONAL MATCH (f)-[:HAS_CONTENT]->(b:Blob)
+        RETURN node.name AS name, node.file AS file,
+               CASE WHEN node.code IS NOT NULL THEN node.code
+                    WHEN node.start IS NOT NULL
+                    THEN substring(f.content, node.start, node.end - node.start)
+               END AS code,
+               node.start AS start, node.end AS end,
+               CASE WHEN node.code IS NULL AND f.content IS NULL THEN b.hash END AS blob
+        ORDER BY score DESC LIMIT $top_k
+        """
+        records = self._read(
+            query, terms=lucene_query(words), project_name=project_name, top_k=top_k
+        )
+        rows = [record.data() for record in records]
+        contents = self._blob_contents({row["blob"] for row in rows if row["blob"]})
+        for row in rows:
+            row["content"] = contents.get(row.pop("blob"))
+        return rows
+
+    def _blob_contents(self, hashes):
+        """Returns the decompressed content of each of the given Blobs, keyed by hash."""
+        if not hashes:
+            return {}
+        records = self._read(
+            "MATCH (b:Blob) WHERE b.hash IN $hashes RETURN b.hash AS hash, b.data AS data",
+            hashes=list(hashes),
+        )
+        return {record["hash"]: decompress_content(record["data"]) for record in records}
+
+    def search_files(self, project_name, words, top_k):
+        query = """
+        CALL db.index.fulltext.queryNodes('file_search', $terms) YIELD node, score
+        MATCH (:Project {name: $project_name})-[:CONTAINS_FILE]->(node)
+        RETURN node.filename AS name, node.path AS file, node.content AS code
+        ORDER BY score DESC LIMIT $top_k
+        """
+        records = self._read(
+            query, terms=lucene_query(words), project_name=project_name, top_k=top_k
+        )
+        return [record.data() for record in records]
+
+
+def lucene_query(words):
+    """
+    Joins words into a Lucene query matching any of them. Each word is quoted, so words
+    such as AND, NOT or TO are searched as terms instead of parsed as operators; words
+    are made of word characters only and need no further escaping inside the quotes.
+    """
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (name TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    filename TEXT,
+    content TEXT,
+    language TEXT,
+    content_hash TEXT,
+    function_calls TEXT,
+    blob_hash TEXT,
+    updated_at REAL,
+    imports TEXT
+);
+CREATE TABLE IF NOT EXISTS project_files (
+    project TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (project, path)
+);
+CREATE TABLE IF NOT EXISTS functions (
+    qualname TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT,
+    file TEXT NOT NULL,
+    code TEXT,
+    start INTEGER,
+    "end" INTEGER,
+    start_line INTEGER,
+    end_line INTEGER,
+    loc INTEGER,
+    cyclomatic INTEGER,
+    max_nesting INTEGER,
+    loop_depth INTEGER,
+    fan_out INTEGER,
+    fan_in INTEGER,
+    calls TEXT,
+    PRIMARY KEY (qualname, file)
+);
+CREATE INDEX IF NOT EXISTS function_file ON functions (file);
+CREATE INDEX IF NOT EXISTS function_name ON functions (name);
+CREATE TABLE IF NOT EXISTS file_packages (
+    file TEXT NOT NULL,
+    package TEXT NOT NULL,
+    PRIMARY KEY (file, package)
+);
+CREATE TABLE IF NOT EXISTS calls (
+    from_path TEXT NOT NULL,
+    to_path TEXT NOT NULL,
+    function TEXT NOT NULL,
+    PRIMARY KEY (from_path, to_path, function)
+);
+CREATE INDEX IF NOT EXISTS calls_to ON calls (to_path);
+CREATE TABLE IF NOT EXISTS imports (
+    from_path TEXT NOT NULL,
+    to_path TEXT NOT NULL,
+    PRIMARY KEY (from_path, to_path)
+);
+CREATE INDEX IF NOT EXISTS imports_to ON imports (to_path);
+CREATE TABLE IF NOT EXISTS function_calls (
+    file TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    callee_file TEXT NOT NULL,
+    callee_qualname TEXT NOT NULL,
+    PRIMARY KEY (file, qualname, callee_file, callee_qualname)
+);
+CREATE INDEX IF NOT EXISTS function_calls_callee
+    ON function_calls (callee_file, callee_qualname);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB,
+    codec TEXT,
+    size INTEGER
+);
+"""
+
+# Columns added after the first release, created on databases that predate them.
+SQLITE_COLUMNS = {
+    "files": {"updated_at": "REAL", "imports": "TEXT"},
+    "functions": {
+        **{metric: "INTEGER" for metric in HOTSPOT_METRICS},
+        "calls": "TEXT",
+    },
+}
+# Indexes on the columns above, created once they exist
+SQLITE_INDEXES = tuple(
+    f"CREATE INDEX IF NOT EXISTS function_{metric} ON functions ({metric})"
+    for metric in HOTSPOT_METRICS
+)
+
+SQLITE_TABLES = (
+    "projects",
+    "files",
+    "project_files",
+    "functions",
+    "file_packages",
+    "calls",
+    "imports",
+    "function_calls",
+    "blobs",
+)
+
+
+class SQLiteStore(GraphStore):
+    """
+    Stores the knowledge graph in an embedded SQLite database, for single-node deployments,
+    tests and benchmarks without a Neo4j server. path may be ":memory:".
+
+    One connection is shared by all threads and serialised with a lock. Searches score
+    functions and files by how many of the words they contain instead of using a
+    full-text index, which is fine at the sizes this backend is meant for.
+    """
+
+    name = "SQLite"
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.create_schema()
+
+    def _run(self, query, params=()):
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def verify_connectivity(self):
+        self._run("SELECT 1")
+
+    def create_schema(self):
+        with self.lock, self.conn:
+            self._rekey_functions()
+            self.conn.executescript(SQLITE_SCHEMA)
+            for table, columns in SQLITE_COLUMNS.items():
+                existing = {
+                    row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")
+                }
+                for column, column_type in columns.items():
+                    if column not in existing:
+                        self.conn.execute(
+                            f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"
+                        )
+            for statement in SQLITE_INDEXES:
+                self.conn.execute(statement)
+            self._copy_name_keyed_functions()
+
+    def _rekey_functions(self):
+        """
+        Moves aside the functions and function_calls tables of a database that keys
+        functions by (name, file), so the schema recreates them keyed by (qualname, file).
+        """
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(functions)")}
+        if not columns or "qualname" in columns:
+            return
+        for table in ("functions", "function_calls"):
+            self.conn.execute(f"ALTER TABLE {table} RENAME TO name_keyed_{table}")
+        # The indexes moved with the tables and would stop the schema from recreating them
+        indexes = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+            "AND tbl_name IN ('name_keyed_functions', 'name_keyed_function_calls')"
+        ).fetchall()
+        for row in indexes:
+            self.conn.execute(f"DROP INDEX {row['name']}")
+
+    def _copy_name_keyed_functions(self):
+        """Copies the tables moved aside by _rekey_functions, with qualname = name."""
+        tables = {
+            row["name"]
+            for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        if "name_keyed_functions" not in tables:
+            return
+        columns = ", ".join(
+            f'"{row["name"]}"'
+            for row in self.conn.execute("PRAGMA table_info(name_keyed_functions)")
+        )
+        self.conn.execute(
+            f"INSERT INTO functions (qualname, kind, {columns}) "
+            f"SELECT name, 'function', {columns} FROM name_keyed_functions"
+        )
+        self.conn.execute(
+            "INSERT INTO function_calls (file, qualname, callee_file, callee_qualname) "
+            "SELECT file, name, callee_file, callee_name FROM name_keyed_function_calls"
+        )
+        self.conn.execute("DROP TABLE name_keyed_functions")
+        self.conn.execute("DROP TABLE name_keyed_function_calls")
+
+    def create_project(self, project_name):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO projects (name) VALUES (?)", (project_name,)
+            )
+
+    def load_files(self, project_name=None):
+        query = (
+            "SELECT f.path, f.filename, f.language, f.content_hash, f.function_calls, "
+            "f.imports FROM files f"
+        )
+        function_query = "SELECT fn.file, fn.name, fn.qualname, fn.calls FROM functions fn"
+        params = ()
+        if project_name:
+            query += " JOIN project_files pf ON pf.path = f.path WHERE pf.project = ?"
+            function_query += (
+                " JOIN project_files pf ON pf.path = fn.file WHERE pf.project = ?"
+            )
+            params = (project_name,)
+        with self.lock:
+            files = self.conn.execute(query, params).fetchall()
+            functions = {}
+            for row in self.conn.execute(function_query, params):
+                functions.setdefault(row["file"], []).append(
+                    {
+                        "name": row["name"],
+                        "qualname": row["qualname"],
+                        "calls": json.loads(row["calls"] or "[]"),
+                    }
+                )
+        return [
+            {
+                "path": row["path"],
+                "filename": row["filename"],
+                "language": row["language"],
+                "content_hash": row["content_hash"],
+                "function_calls": json.loads(row["function_calls"] or "[]"),
+                "imports": json.loads(row["imports"] or "[]"),
+                "functions": functions.get(row["path"], []),
+            }
+            for row in files
+        ]
+
+    def write_file(self, row, project_name=None):
+        with self.lock, self.conn:
+            self._write_files([row], project_name)
+
+    def write_function(self, row):
+        with self.lock, self.conn:
+            self._write_functions([row])
+
+    def write_package(self, file_path, package_name):
+        with self.lock, self.conn:
+            self._write_packages([{"file": file_path, "name": package_name}])
+
+    def remove_stale(self, rows):
+        with self.lock, self.conn:
+            self._remove_stale(rows)
+
+    def write_batch(self, rows, project_name=None):
+        with self.lock, self.conn:
+            self._write_files(rows["files"], project_name)
+            self._write_functions(rows["functions"])
+            self._write_packages(rows["packages"])
+            self._remove_stale(rows["stale"])
+            self._write_blobs(rows["new_blobs"])
+            self._link_blobs(rows["blobs"])
+
+    def _write_files(self, rows, project_name):
+        """Caller holds the lock and the transaction, as for the other _write helpers."""
+        self.conn.executemany(
+            "INSERT INTO files (path, filename, content, language, content_hash, "
+            "function_calls, imports, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET filename = excluded.filename, "
+            "content = excluded.content, language = excluded.language, "
+            "content_hash = excluded.content_hash, function_calls = excluded.function_calls, "
+            "imports = excluded.imports, "
+            "updated_at = CASE WHEN files.content_hash = excluded.content_hash "
+            "THEN coalesce(files.updated_at, excluded.updated_at) ELSE excluded.updated_at END",
+            [
+                (
+                    row["path"],
+                    row["filename"],
+                    row["content"],
+                    row["language"],
+                    row["content_hash"],
+                    json.dumps(row["function_calls"] or []),
+                    json.dumps(row.get("imports") or []),
+                    time.time(),
+                )
+                for row in rows
+            ],
+        )
+        if project_name:
+            # Like the Neo4j OPTIONAL MATCH, files are only attached to an existing project
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO project_files (project, path) "
+                "SELECT name, ? FROM projects WHERE name = ?",
+                [(row["path"], project_name) for row in rows],
+            )
+
+    def _write_functions(self, rows):
+        columns = ", ".join(METRICS)
+        self.conn.executemany(
+            f"INSERT INTO functions (qualname, name, kind, file, code, start, \"end\", "
+            f"start_line, end_line, calls, {columns}) "
+            f"SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {', '.join('?' * len(METRICS))} "
+            f"WHERE EXISTS (SELECT 1 FROM files WHERE path = ?) "
+            f"ON CONFLICT (qualname, file) DO UPDATE SET name = excluded.name, "
+            f"kind = excluded.kind, code = excluded.code, "
+            f'start = excluded.start, "end" = excluded."end", '
+            f"start_line = excluded.start_line, end_line = excluded.end_line, "
+            f"calls = excluded.calls, "
+            + ", ".join(f"{metric} = excluded.{metric}" for metric in METRICS),
+            [
+                (
+                    row["qualname"],
+                    row["name"],
+                    row["kind"],
+                    row["file"],
+                    row["code"],
+                    row["start"],
+                    row["end"],
+                    row["start_line"],
+                    row["end_line"],
+                    json.dumps(row.get("calls") or []),
+                    *(row.get(metric) for metric in METRICS),
+                    row["file"],
+                )
+                for row in rows
+            ],
+        )
+
+    def _write_packages(self, rows):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO file_packages (file, package) "
+            "SELECT ?, ? WHERE EXISTS (SELECT 1 FROM files WHERE path = ?)",
+            [(row["file"], row["name"], row["file"]) for row in rows],
+        )
+
+    def _remove_stale(self, rows):
+        for row in rows:
+            functions = list(row["functions"])
+            stale = self.conn.execute(
+                f"SELECT qualname FROM functions WHERE file = ? "
+                f"AND qualname NOT IN ({', '.join('?' * len(functions))})",
+                [row["path"], *functions],
+            ).fetchall()
+            self.conn.executemany(
+                "DELETE FROM functions WHERE file = ? AND qualname = ?",
+                [(row["path"], r["qualname"]) for r in stale],
+            )
+            # Like DETACH DELETE, removed functions lose their CALLS edges both ways
+            self.conn.executemany(
+                "DELETE FROM function_calls WHERE (file = ? AND qualname = ?) "
+                "OR (callee_file = ? AND callee_qualname = ?)",
+                [(row["path"], r["qualname"], row["path"], r["qualname"]) for r in stale],
+            )
+            packages = list(row["packages"])
+            self.conn.execute(
+                f"DELETE FROM file_packages WHERE file = ? "
+                f"AND package NOT IN ({', '.join('?' * len(packages))})",
+                [row["path"], *packages],
+            )
+
+    def existing_blobs(self, hashes):
+        found = set()
+        hashes = list(hashes)
+        # Stay below SQLite's limit on bound parameters
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i : i + 500]
+            rows = self._run(
+                f"SELECT hash FROM blobs WHERE hash IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update(row["hash"] for row in rows)
+        return found
+
+    def write_blobs(self, rows):
+        with self.lock, self.conn:
+            self._write_blobs(rows)
+
+    def link_blobs(self, rows):
+        with self.lock, self.conn:
+            self._link_blobs(rows)
+
+    def _write_blobs(self, rows):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO blobs (hash, data, codec, size) VALUES (?, ?, ?, ?)",
+            [(row["hash"], row["data"], BLOB_CODEC, row["size"]) for row in rows],
+        )
+
+    def _link_blobs(self, rows):
+        self.conn.executemany(
+            "UPDATE files SET blob_hash = ? WHERE path = ?",
+            [(row["hash"], row["path"]) for row in rows],
+        )
+
+    def write_call_edges(self, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO calls (from_path, to_path, function) "
+                "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM files WHERE path = ?) "
+                "AND EXISTS (SELECT 1 FROM files WHERE path = ?)",
+                [
+                    (row["from"], row["to"], row["function"], row["from"], row["to"])
+                    for row in rows
+                ],
+            )
+
+    def delete_call_edges(self, rows):
+        with self.lock, self.conn:
+            for row in rows:
+                self.conn.execute("DELETE FROM calls WHERE from_path = ?", (row["path"],))
+                self.conn.executemany(
+                    "DELETE FROM calls WHERE to_path = ? AND function = ?",
+                    [(row["path"], name) for name in row["removed"]],
+                )
+
+    def write_function_calls(self, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO function_calls "
+                "(file, qualname, callee_file, callee_qualname) SELECT ?, ?, ?, ? "
+                "WHERE EXISTS (SELECT 1 FROM functions WHERE file = ? AND qualname = ?) "
+                "AND EXISTS (SELECT 1 FROM functions WHERE file = ? AND qualname = ?)",
+                [
+                    (
+                        row["file"],
+                        row["qualname"],
+                        row["callee_file"],
+                        row["callee_qualname"],
+                        row["file"],
+                        row["qualname"],
+                        row["callee_file"],
+                        row["callee_qualname"],
+                    )
+                    for row in rows
+                ],
+            )
+
+    def delete_function_calls(self, paths):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM function_calls WHERE file = ?", [(path,) for path in paths]
+            )
+
+    def write_imports(self, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO imports (from_path, to_path) "
+                "SELECT ?, ? WHERE EXISTS (SELECT 1 FROM files WHERE path = ?) "
+                "AND EXISTS (SELECT 1 FROM files WHERE path = ?)",
+                [(row["from"], row["to"], row["from"], row["to"]) for row in rows],
+            )
+
+    def delete_imports(self, paths):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM imports WHERE from_path = ?", [(path,) for path in paths]
+            )
+
+    def remove_package_uses(self, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM file_packages WHERE file = ? AND package = ?",
+                [(row["file"], row["name"]) for row in rows],
+            )
+
+    def update_fan_in(self, project_name=None):
+        query = (
+            "UPDATE functions SET fan_in = (SELECT count(*) FROM function_calls c "
+            "WHERE c.callee_file = functions.file AND c.callee_qualname = functions.qualname)"
+        )
+        params = ()
+        if project_name:
+            query += " WHERE file IN (SELECT path FROM project_files WHERE project = ?)"
+            params = (project_name,)
+        with self.lock, self.conn:
+            self.conn.execute(query, params)
+
+    def execute_query(self, query, **kwargs):
+        with self.lock, self.conn:
+            return self.conn.execute(query, kwargs).fetchall()
+
+    def delete_all(self):
+        with self.lock, self.conn:
+            for table in SQLITE_TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def delete_project(self, project_name):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM projects WHERE name = ?", (project_name,))
+            self.conn.execute(
+                "DELETE FROM project_files WHERE project = ?", (project_name,)
+            )
+
+    def list_projects(self):
+        return [row["name"] for row in self._run("SELECT name FROM projects")]
+
+    def project_exists(self, project_name):
+        return bool(
+            self._run("SELECT 1 FROM projects WHERE name = ?", (project_name,))
+        )
+
+    def project_files(self, project_name):
+        rows = self._run(
+            "SELECT f.path, coalesce(f.content, b.data) AS content "
+            "FROM project_files pf JOIN files f ON f.path = pf.path "
+            "LEFT JOIN blobs b ON b.hash = f.blob_hash "
+            "WHERE pf.project = ? ORDER BY f.path",
+            (project_name,),
+        )
+        return [(row["path"], decompress_content(row["content"])) for row in rows]
+
+    def project_version(self, project_name):
+        rows = self._run(
+            "SELECT f.path, f.content_hash, f.updated_at "
+            "FROM project_files pf JOIN files f ON f.path = pf.path "
+            "WHERE pf.project = ? ORDER BY f.path",
+            (project_name,),
+        )
+        if not rows:
+            return None
+        return _version_digest(rows), max(row["updated_at"] or 0 for row in rows)
+
+    def hotspots(self, project_name, metric, limit):
+        _check_metric(metric)
+        rows = self._run(
+            f"SELECT fn.name, fn.qualname, fn.kind, fn.file, fn.start_line, fn.end_line, "
+            f"{', '.join(HOTSPOT_METRICS)} "
+            f"FROM project_files pf JOIN functions fn ON fn.file = pf.path "
+            f"WHERE pf.project = ? AND fn.{metric} IS NOT NULL "
+            f"AND coalesce(fn.kind, '') <> 'class' "
+            f"ORDER BY fn.{metric} DESC, fn.file, fn.qualname LIMIT ?",
+            (project_name, limit),
+        )
+        return [dict(row) for row in rows]
+
+    def import_edges(self, project_name):
+        rows = self._run(
+            "SELECT i.from_path, i.to_path FROM project_files pf "
+            "JOIN imports i ON i.from_path = pf.path WHERE pf.project = ?",
+            (project_name,),
+        )
+        return [{"from": row["from_path"], "to": row["to_path"]} for row in rows]
+
+    def find_functions(self, project_name, name):
+        rows = self._run(
+            "SELECT fn.file, fn.name, fn.qualname FROM project_files pf "
+            "JOIN functions fn ON fn.file = pf.path "
+            "WHERE pf.project = ? AND (fn.name = ? OR fn.qualname = ?) "
+            "ORDER BY fn.file, fn.qualname",
+            (project_name, name, name),
+        )
+        return [dict(row) for row in rows]
+
+    def call_neighbors(self, functions, direction):
+        # The frontier is bound as one JSON array so its size is not limited by the
+        # number of bound parameters
+        source, target = ("", "callee_") if direction == "callees" else ("callee_", "")
+        rows = self._run(
+            f"SELECT DISTINCT fn.file, fn.name, fn.qualname "
+            f"FROM json_each(?) j JOIN function_calls c "
+            f"ON c.{source}file = json_extract(j.value, '$.file') "
+            f"AND c.{source}qualname = json_extract(j.value, '$.qualname') "
+            f"JOIN functions fn "
+            f"ON fn.file = c.{target}file AND fn.qualname = c.{target}qualname",
+            (
+                json.dumps(
+                    [{"file": fn["file"], "qualname": fn["qualname"]} for fn in functions]
+                ),
+            ),
+        )
+        return [dict(row) for row in rows]
+
+    def search_functions(self, project_name, words, top_k):
+        score = _word_score("fn.name || ' ' || coalesce(fn.code, '')", words)
+        rows = self._run(
+            f"SELECT fn.name, fn.file, fn.start, fn.\"end\", "
+            f"CASE WHEN fn.code IS NOT NULL THEN fn.code "
+            f"WHEN fn.start IS NOT NULL "
+            f"THEN substr(f.content, fn.start + 1, fn.\"end\" - fn.start) END AS code, "
+            f"CASE WHEN fn.code IS NULL AND f.content IS NULL THEN f.blob_hash END AS blob, "
+            f"{score} AS score "
+            f"FROM project_files pf JOIN files f ON f.path = pf.path "
+            f"JOIN functions fn ON fn.file = f.path "
+            f"WHERE pf.project = ? AND score > 0 ORDER BY score DESC LIMIT ?",
+            [*(w.lower() for w in words), project_name, top_k],
+        )
+        contents = self._blob_contents({row["blob"] for row in rows if row["blob"]})
+        return [
+            {
+                "name": row["name"],
+                "file": row["file"],
+                "code": row["code"],
+                "start": row["start"],
+                "end": row["end"],
+                "content": contents.get(row["blob"]),
+            }
+            for row in rows
+        ]
+
+    def _blob_contents(self, hashes):
+        """Returns the decompressed content of each of the given Blobs, keyed by hash."""
+        if not hashes:
+            return {}
+        hashes = list(hashes)
+        rows = self._run(
+            f"SELECT hash, data FROM blobs WHERE hash IN ({', '.join('?' * len(hashes))})",
+            hashes,
+        )
+        return {row["hash"]: decompress_content(row["data"]) for row in rows}
+
+    def search_files(self, project_name, words, top_k):
+        score = _word_score("coalesce(f.content, '')", words)
+        rows = self._run(
+            f"SELECT f.filename, f.path, f.content, {score} AS score "
+            f"FROM project_files pf JOIN files f ON f.path = pf.path "
+            f"WHERE pf.project = ? AND score > 0 ORDER BY score DESC LIMIT ?",
+            [*(w.lower() for w in words), project_name, top_k],
+        )
+        return [
+            {"name": row["filename"], "file": row["path"], "code": row["content"]}
+            for row in rows
+        ]
+
+
+def _check_metric(metric):
+    """Metric names are interpolated into queries, so only the known ones are accepted."""
+    if metric not in HOTSPOT_METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+
+
+def _version_digest(rows):
+    """SHA-256 over the (path, content_hash) of a project's files, in path order."""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(f"{row['path']}\0{row['content_hash'] or ''}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _word_score(text, words):
+    """SQL expression counting how many of the words (bound in order) occur in text."""
+    if not words:
+        return "0"
+    return " + ".join(f"(instr(lower({text}), ?) > 0)" for _ in words)
+
+
+def create_store(backend=STORAGE_BACKEND):
+    """Creates the storage backend selected by the configuration ("neo4j" or "sqlite")."""
+    if backend == "neo4j":
+        return Neo4jStore(NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE)
+    if backend == "sqlite":
+        return SQLiteStore(SQLITE_PATH)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# config.py reads the environment at import time, before any test module imports the app
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = ":memory:"
+os.environ["ANALYSIS_CACHE_DIR"] = tempfile.mkdtemp()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    """Every test starts from an empty graph, as the app's store is shared by all tests."""
+    import app
+
+    app.store.delete_all()
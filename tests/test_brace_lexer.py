@@ -0,0 +1,44 @@
+import time
+
+from inserter import CPP_LEXER, JAVASCRIPT_LEXER
+
+C_SOURCE = '''// int commented(void) {
+static const char *s = "int fake(void) { }";
+int
+real(int a, char *b)
+{
+    char c = '}';
+    if (a) {
+        for (;;) { }
+    } else if (b) {
+        while (1) { }
+    }
+    switch (a) { }
+    return 0;
+}
+static inline unsigned long add(unsigned long a, unsigned long b) {
+    return a + b; /* } */
+}
+'''
+
+
+def spans(functions):
+    return [(f["name"], f["start_line"], f["end_line"]) for f in functions]
+
+
+def test_braces_and_headers_in_strings_and_comments_are_ignored():
+    assert spans(CPP_LEXER.extract_functions(C_SOURCE)) == [("real", 3, 14), ("add", 15, 17)]
+
+
+def test_javascript_headers_in_comments_are_ignored():
+    source = "// function hidden() {\nfunction shown(a) {\n  return '{';\n}\n"
+    assert spans(JAVASCRIPT_LEXER.extract_functions(source)) == [("shown", 2, 4)]
+
+
+def test_long_comment_is_scanned_in_linear_time():
+    source = "/* " + "word " * 8000 + "*/\nint main(void) {\n    return 0;\n}\n"
+    source += "word " * 8000 + "\n"
+    started = time.perf_counter()
+    functions = CPP_LEXER.extract_functions(source)
+    assert time.perf_counter() - started < 1.0
+    assert [f["name"] for f in functions] == ["main"]
@@ -0,0 +1,83 @@
+import io
+import sqlite3
+
+import app as app_module
+from storage import SQLiteStore
+
+METHODS = """def helper():
+    return 1
+
+
+class A:
+    def __init__(self):
+        self.value = helper()
+
+
+class B:
+    def __init__(self):
+        pass
+"""
+
+
+def test_same_named_methods_are_separate_functions():
+    client = app_module.app.test_client()
+    response = client.post(
+        "/project/create",
+        data={
+            "project_name": "methods",
+            "files": [(io.BytesIO(METHODS.encode("utf-8")), "models.py")],
+        },
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+
+    rows = app_module.store._run(
+        "SELECT qualname, kind, start_line, end_line, calls, fan_in FROM functions "
+        "WHERE file = 'methods/models.py' ORDER BY start_line"
+    )
+    assert [(r["qualname"], r["kind"], r["start_line"], r["end_line"]) for r in rows] == [
+        ("helper", "function", 1, 2),
+        ("A.__init__", "method", 6, 7),
+        ("B.__init__", "method", 11, 12),
+    ]
+    assert [r["calls"] for r in rows[1:]] == ['["helper"]', "[]"]
+    assert rows[0]["fan_in"] == 1
+
+    response = client.get("/project/methods/functions/helper/callers")
+    assert [f["qualname"] for f in response.get_json()["functions"]] == ["A.__init__"]
+    response = client.get("/project/methods/functions/B.__init__/callees")
+    assert response.get_json()["functions"] == []
+
+
+def test_name_keyed_database_is_migrated(tmp_path):
+    path = str(tmp_path / "graph.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE functions (
+            name TEXT NOT NULL, file TEXT NOT NULL, code TEXT, calls TEXT,
+            PRIMARY KEY (name, file)
+        );
+        CREATE INDEX function_file ON functions (file);
+        CREATE TABLE function_calls (
+            file TEXT NOT NULL, name TEXT NOT NULL,
+            callee_file TEXT NOT NULL, callee_name TEXT NOT NULL,
+            PRIMARY KEY (file, name, callee_file, callee_name)
+        );
+        INSERT INTO functions VALUES ('run', 'a.py', 'def run(): go()', '["go"]');
+        INSERT INTO functions VALUES ('go', 'a.py', 'def go(): pass', '[]');
+        INSERT INTO function_calls VALUES ('a.py', 'run', 'a.py', 'go');
+        """
+    )
+    conn.close()
+
+    store = SQLiteStore(path)
+    functions = store._run("SELECT qualname, name, kind, code FROM functions ORDER BY name")
+    assert [tuple(row) for row in functions] == [
+        ("go", "go", "function", "def go(): pass"),
+        ("run", "run", "function", "def run(): go()"),
+    ]
+    calls = store._run("SELECT file, qualname, callee_file, callee_qualname FROM function_calls")
+    assert [tuple(row) for row in calls] == [("a.py", "run", "a.py", "go")]
+    assert store._run("PRAGMA index_list(functions)")
+    store.close()
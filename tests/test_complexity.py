@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+import app as app_module
+from inserter import KnowledgeGraphImporter
+
+DOCUMENTED = '''def documented(x):
+    """Return x if it is set, for example
+    while looping, or when x is None and empty:
+    for each case, except none.
+    """
+    return x
+'''
+
+NESTED_LOOPS_C = """int sum(int **grid, int rows, int cols) {
+    int total = 0;
+    for (int i = 0; i < rows; i++) {
+        for (int j = 0; j < cols; j++) {
+            if (grid[i][j] > 0) {
+                total += grid[i][j];
+            }
+        }
+    }
+    return total;
+}
+
+int first(int *values, int count) {
+    while (count--) {
+        return values[count];
+    }
+    return 0;
+}
+"""
+
+
+@pytest.mark.parametrize("python_ast", [False, True], ids=["lines", "ast"])
+def test_docstring_prose_is_not_counted(python_ast):
+    importer = KnowledgeGraphImporter(None, None, None, None, python_ast=python_ast)
+    functions = importer.extract_python_functions(DOCUMENTED)
+    importer.add_function_metrics(functions, ".py")
+    metrics = {m: functions[0][m] for m in ("cyclomatic", "max_nesting", "loop_depth")}
+    assert metrics == {"cyclomatic": 1, "max_nesting": 0, "loop_depth": 0}
+
+
+def test_hotspots_only_list_c_functions():
+    client = app_module.app.test_client()
+    response = client.post(
+        "/project/create",
+        data={
+            "project_name": "loops",
+            "files": [(io.BytesIO(NESTED_LOOPS_C.encode("utf-8")), "grid.c")],
+        },
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+
+    response = client.get("/project/loops/hotspots?metric=loop_depth")
+    assert response.status_code == 200
+    functions = response.get_json()["functions"]
+    assert [(f["name"], f["loop_depth"]) for f in functions] == [("sum", 2), ("first", 1)]
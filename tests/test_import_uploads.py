@@ -0,0 +1,96 @@
+import io
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
+
+
+def upload(client, project_name, files):
+    return client.post(
+        "/project/create",
+        data={
+            "project_name": project_name,
+            "files": [
+                (io.BytesIO(source.encode("utf-8")), filename)
+                for filename, source in files.items()
+            ],
+        },
+        content_type="multipart/form-data",
+    )
+
+
+def test_uploads_only_link_files_of_the_same_project(client):
+    # Both projects define and call a function with the same name
+    first = upload(
+        client,
+        "first",
+        {
+            "a.py": "def helper():\n    return 1\n",
+            "b.py": "def run():\n    return helper()\n",
+        },
+    )
+    second = upload(
+        client,
+        "second",
+        {
+            "c.py": "def helper():\n    return 2\n",
+            "d.py": "def main():\n    return helper()\n",
+        },
+    )
+    assert first.status_code == 200
+    assert second.status_code == 200
+
+    store = app_module.store
+    calls = {
+        (row["from_path"], row["to_path"], row["function"])
+        for row in store._run("SELECT from_path, to_path, function FROM calls")
+    }
+    assert calls == {
+        ("first/b.py", "first/a.py", "helper"),
+        ("second/d.py", "second/c.py", "helper"),
+    }
+    function_calls = {
+        (row["file"], row["qualname"], row["callee_file"], row["callee_qualname"])
+        for row in store._run(
+            "SELECT file, qualname, callee_file, callee_qualname FROM function_calls"
+        )
+    }
+    assert function_calls == {
+        ("first/b.py", "run", "first/a.py", "helper"),
+        ("second/d.py", "main", "second/c.py", "helper"),
+    }
+
+
+def test_reupload_updates_the_project_in_incremental_mode(client, monkeypatch):
+    files = {
+        "a.py": "def helper():\n    return 1\n",
+        "b.py": "def run():\n    return helper()\n",
+    }
+    assert upload(client, "repeat", files).status_code == 200
+    # Without incremental mode an existing project cannot be uploaded again
+    assert upload(client, "repeat", files).status_code == 400
+
+    monkeypatch.setattr(app_module, "INGEST_INCREMENTAL", True)
+    files["a.py"] = "def helper():\n    return 2\n\n\ndef extra():\n    return 3\n"
+    response = upload(client, "repeat", files)
+    assert response.status_code == 200
+    assert response.get_json()["message"] == "Project updated successfully"
+
+    store = app_module.store
+    functions = {
+        (row["file"], row["qualname"])
+        for row in store._run("SELECT file, qualname FROM functions")
+    }
+    assert functions == {
+        ("repeat/a.py", "helper"),
+        ("repeat/a.py", "extra"),
+        ("repeat/b.py", "run"),
+    }
+    function_calls = store._run("SELECT file, qualname, callee_qualname FROM function_calls")
+    assert [tuple(row) for row in function_calls] == [("repeat/b.py", "run", "helper")]
@@ -0,0 +1,50 @@
+from imports import ImportResolver
+from inserter import KnowledgeGraphImporter
+from storage import SQLiteStore
+
+PATHS = [
+    "p/app/__init__.py",
+    "p/app/main.py",
+    "p/app/handlers/__init__.py",
+    "p/app/handlers/logging.py",
+    "p/vendor/simplejson/__init__.py",
+    "p/vendor/simplejson/json.py",
+    "p/src/lib/__init__.py",
+    "p/src/lib/util.py",
+    "p/tests/test_util.py",
+    "p/java/com/acme/Main.java",
+    "p/java/com/acme/io/Reader.java",
+    "p/java/org/other/acme/io/Reader2.java",
+]
+
+
+def test_absolute_imports_resolve_under_searchable_roots():
+    resolver = ImportResolver(PATHS)
+    assert resolver.resolve("p/app/main.py", "app.handlers.logging") == (
+        "p/app/handlers/logging.py"
+    )
+    assert resolver.resolve("p/tests/test_util.py", "lib.util") == "p/src/lib/util.py"
+    assert resolver.resolve("p/app/main.py", ".handlers") == "p/app/handlers/__init__.py"
+    assert resolver.resolve("p/java/com/acme/Main.java", "com.acme.io.Reader") == (
+        "p/java/com/acme/io/Reader.java"
+    )
+
+
+def test_module_names_matching_a_nested_file_stay_external():
+    resolver = ImportResolver(PATHS)
+    assert resolver.resolve("p/app/main.py", "logging") is None
+    assert resolver.resolve("p/app/main.py", "json") is None
+    assert resolver.resolve("p/java/com/acme/Main.java", "acme.io.Reader2") is None
+
+
+def test_unresolved_imports_keep_their_package():
+    store = SQLiteStore(":memory:")
+    importer = KnowledgeGraphImporter(None, None, None, None, store=store)
+    importer.import_content("p/app/main.py", "import logging\nimport json\n")
+    importer.import_content("p/app/handlers/logging.py", "LEVEL = 1\n")
+    importer.import_content("p/vendor/simplejson/json.py", "def dumps(x):\n    pass\n")
+    importer.process_import_relationships()
+
+    packages = store._run("SELECT package FROM file_packages WHERE file = 'p/app/main.py'")
+    assert sorted(row["package"] for row in packages) == ["json", "logging"]
+    assert store._run("SELECT * FROM imports") == []
@@ -0,0 +1,56 @@
+import pytest
+
+from inserter import KnowledgeGraphImporter
+
+SOURCE = '''def outer(x):
+    """Doc.
+Continued at column 0.
+def fake(y):
+    return y
+"""
+    return x
+
+
+@decorator
+@other(1)
+def decorated():
+    return 1
+
+
+class A:
+    @property
+    def value(self):
+        text = \'\'\'
+def not_a_method():
+\'\'\'
+        return text
+'''
+
+
+@pytest.fixture(params=[False, True], ids=["lines", "ast"])
+def importer(request):
+    return KnowledgeGraphImporter(None, None, None, None, python_ast=request.param)
+
+
+def functions_by_name(importer):
+    return {
+        f["name"]: f
+        for f in importer.extract_python_functions(SOURCE)
+        if f["kind"] != "class"
+    }
+
+
+def test_strings_do_not_start_or_end_definitions(importer):
+    functions = functions_by_name(importer)
+    assert set(functions) == {"outer", "decorated", "value"}
+    assert functions["outer"]["code"].endswith("    return x")
+    assert (functions["outer"]["start_line"], functions["outer"]["end_line"]) == (1, 7)
+    assert functions["value"]["code"].endswith("        return text")
+
+
+def test_decorators_belong_to_the_definition(importer):
+    functions = functions_by_name(importer)
+    assert functions["decorated"]["code"].startswith("@decorator\n@other(1)\ndef decorated")
+    assert functions["decorated"]["start_line"] == 10
+    assert functions["value"]["code"].startswith("@property\n    def value")
+    assert functions["value"]["start"] == SOURCE.index("@property")
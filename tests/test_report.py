@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app_module.app.config["TESTING"] = True
+    # Reports render without fpdf; only the HTTP handling is under test
+    monkeypatch.setattr(
+        app_module.analyzer, "render_pdf", lambda *args: b"%PDF-1.4 report"
+    )
+    return app_module.app.test_client()
+
+
+def upload(client, project_name):
+    return client.post(
+        "/project/create",
+        data={
+            "project_name": project_name,
+            "files": [(io.BytesIO(b"def main():\n    return 0\n"), "main.py")],
+        },
+        content_type="multipart/form-data",
+    )
+
+
+def test_report_revalidates_with_the_same_strong_etag(client):
+    assert upload(client, "reported").status_code == 200
+
+    response = client.get("/project/reported/report")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+
+    revalidated = client.get("/project/reported/report", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+
+def test_report_of_a_missing_project_is_not_found(client):
+    assert client.get("/project/missing/report").status_code == 404
+
+
+def test_async_report_too_large_to_cache_is_still_served(client, monkeypatch):
+    assert upload(client, "large").status_code == 200
+    analyzer = app_module.analyzer
+    monkeypatch.setattr(analyzer.report_cache, "max_bytes", 4)
+
+    first = client.get("/project/large/report?async=true")
+    assert first.status_code in (200, 202)
+    if first.status_code == 202:
+        for render in list(analyzer.report_renders.values()):
+            render.result(timeout=10)
+        response = client.get("/project/large/report?async=true")
+        assert response.status_code == 200
+        assert response.data == b"%PDF-1.4 report"
+    assert analyzer.report_renders == {}
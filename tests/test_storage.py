@@ -0,0 +1,9 @@
+from storage import SQLiteStore
+
+
+def test_sqlite_store_runs_custom_queries():
+    store = SQLiteStore(":memory:")
+    store.create_project("custom")
+    store.execute_query("INSERT INTO projects (name) VALUES (:name)", name="added")
+    rows = store.execute_query("SELECT name FROM projects ORDER BY name")
+    assert [row["name"] for row in rows] == ["added", "custom"]